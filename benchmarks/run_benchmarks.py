@@ -0,0 +1,243 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from pymicruler.bp.BpRuler import BpRuler
+from pymicruler.bp.EucastParser import EucastParser
+from pymicruler.bp import RuleBasedEngine
+from pymicruler.bp.TaxonomyHandler import TaxonomyService
+from pymicruler.utils import util
+
+# -------BENCHMARKS-------
+
+# Times the parser, the three BpRuler analyses and the rule-based engine on the
+# bundled v8.1/v9.0 breakpoint tables and synthetic MIC tables, and writes the
+# timings to a JSON file. The NCBI taxonomy is replaced by the lineages in
+# offline_lineages.json, no database or network access is needed.
+#
+#   python benchmarks/run_benchmarks.py --sizes 1000 100000 1000000
+#   python benchmarks/run_benchmarks.py --baseline old_results.json
+#
+# Synthetic samples are derived from the sample panels in test/resources/ruler_input.xlsx
+# by shifting every MIC by up to two dilution steps.
+
+working_directory = os.path.abspath(os.path.dirname(__file__))
+repo_directory = os.path.dirname(working_directory)
+
+PANELS = os.path.join(repo_directory, 'test', 'resources', 'ruler_input.xlsx')
+LINEAGES = os.path.join(working_directory, 'offline_lineages.json')
+
+RESOURCES = {
+    'v8.1': os.path.join(repo_directory, 'test', 'resources',
+                         'processed_v_8.1_Breakpoint_Tables.xlsx'),
+    'v9.0': os.path.join(repo_directory, 'demo', 'demo_results',
+                         'processed_v_9.0_Breakpoint_Tables.xlsx')}
+
+PREPROCESSED = {
+    'v8.1': os.path.join(repo_directory, 'demo', 'demo_resources',
+                         'preprocessed_v_8.1_Breakpoint_Tables.xlsx'),
+    'v9.0': os.path.join(repo_directory, 'demo', 'demo_resources',
+                         'preprocessed_v_9.0_Breakpoint_Tables.xlsx')}
+
+
+class OfflineNCBI:
+    """
+    Stands in for the NCBI taxonomy database: every organism that is not part
+    of the loaded lineages is unknown.
+    """
+    @staticmethod
+    def get_name_translator(names):
+        return dict()
+
+    @staticmethod
+    def get_lineage(taxid):
+        raise KeyError(taxid)
+
+
+class OfflineTaxonomy(TaxonomyService):
+    def _connect(self):
+        return OfflineNCBI()
+
+
+def use_offline_taxonomy():
+    """
+    Replaces the shared taxonomy service by one that only knows the bundled
+    lineages.
+    """
+    TaxonomyService.instance = OfflineTaxonomy()
+    TaxonomyService.instance.load_snapshot(LINEAGES)
+
+
+def synthetic_mics(n_rows, seed=0):
+    """
+    Creates an AST result table with at least n_rows rows from the bundled
+    sample panels.
+
+    :param n_rows: Minimal number of rows
+    :type: Integer
+    :param seed: Seed of the random generator
+    :type: Integer
+    :return: AST results with sample_id, organism, cmp_name and MIC
+    :rtype: Pandas DataFrame
+    """
+    panels = [x[1] for x in pd.read_excel(PANELS).groupby('sample_id', sort=False)]
+    random = np.random.RandomState(seed)
+
+    n_samples = 0
+    chosen = []
+    while sum(len(x) for x in chosen) < n_rows:
+        chosen.append(panels[random.randint(len(panels))])
+        n_samples += 1
+
+    table = pd.concat(chosen, ignore_index=True)
+    table['sample_id'] = np.repeat(np.arange(n_samples), [len(x) for x in chosen])
+    table['MIC'] = table.MIC * 2.0 ** random.randint(-2, 3, len(table))
+    return table[util.Cols.FULL.value].head(n_rows)
+
+
+def measure(function, repeats):
+    """
+    Runs a function several times and returns the fastest run. The outcome
+    cache of the rule-based engine is emptied before every run.
+
+    :param function: Function to be timed
+    :type: Callable
+    :param repeats: Number of runs
+    :type: Integer
+    :return: Duration of the fastest run in seconds
+    :rtype: Float
+    """
+    durations = []
+    for _ in range(repeats):
+        RuleBasedEngine.outcome_cache.clear()
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+def bench_parser(version, repeats):
+    """
+    Times the parsing of a preprocessed Eucast table. The comment reference
+    that is rewritten by the parser is restored afterwards.
+    """
+    with open(util.Path.OLD_OCC.value, 'r', encoding='UTF-8') as f_handle:
+        comments = f_handle.read()
+    had_changes = os.path.exists(util.Path.IRU_CHANGES.value)
+    try:
+        return measure(lambda: EucastParser().run_eucast_parser(PREPROCESSED[version]), repeats)
+    finally:
+        with open(util.Path.OLD_OCC.value, 'w', encoding='UTF-8') as f_handle:
+            f_handle.write(comments)
+        if not had_changes and os.path.exists(util.Path.IRU_CHANGES.value):
+            os.remove(util.Path.IRU_CHANGES.value)
+
+
+def bench_ruler(version, table, processes, repeats):
+    """
+    Times breakpoint query, classification, whole phenotype and the rule-based
+    engine on their own for one table.
+    """
+    resource = RESOURCES[version]
+    BpRuler().run_breakpoint_query(resource, table.head(10).copy())
+
+    timings = dict()
+    timings['run_breakpoint_query'] = measure(
+        lambda: BpRuler(processes).run_breakpoint_query(resource, table.copy()), repeats)
+    timings['run_sample_classification'] = measure(
+        lambda: BpRuler(processes).run_sample_classification(resource, table.copy()), repeats)
+    timings['get_whole_resistance_phenotype'] = measure(
+        lambda: BpRuler(processes).get_whole_resistance_phenotype(resource, table.copy()),
+        repeats)
+
+    ruler = BpRuler(processes)
+    ruler.run_sample_classification(resource, table.copy(), 'sample')
+    groups = ruler.sample.groupby('sample_id')
+    engine = RuleBasedEngine.BacterialResistance()
+    timings['run_rbe'] = measure(
+        lambda: RuleBasedEngine.run_rbe(groups, engine, processes=processes), repeats)
+    return timings
+
+
+def compare(results, baseline_path, tolerance):
+    """
+    Prints benchmarks that became slower than the baseline by more than the
+    tolerance.
+
+    :return: Whether a regression was found
+    :rtype: Boolean
+    """
+    with open(baseline_path, 'r', encoding='UTF-8') as f_handle:
+        baseline = {(x['name'], x['resource'], x['rows']): x['seconds']
+                    for x in json.load(f_handle)['results']}
+
+    regression = False
+    for entry in results:
+        old = baseline.get((entry['name'], entry['resource'], entry['rows']))
+        if old is None or old == 0:
+            continue
+        ratio = entry['seconds'] / old
+        if ratio > 1 + tolerance:
+            regression = True
+            print('Regression: {} ({}, {} rows) {:.3f}s -> {:.3f}s'.format(
+                entry['name'], entry['resource'], entry['rows'], old, entry['seconds']))
+    return regression
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks for pymicruler.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000],
+                        help='Number of rows of the synthetic MIC tables.')
+    parser.add_argument('--resources', nargs='+', default=sorted(RESOURCES),
+                        choices=sorted(RESOURCES), help='Breakpoint table versions.')
+    parser.add_argument('--repeats', type=int, default=3,
+                        help='Runs per benchmark, the fastest is reported.')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='Worker processes of the rule-based engine.')
+    parser.add_argument('--skip-parser', action='store_true',
+                        help='Do not time the Eucast parser.')
+    parser.add_argument('--out', default='benchmark_results.json',
+                        help='Path of the JSON result file.')
+    parser.add_argument('--baseline', default=None,
+                        help='Result file of an earlier run to compare with.')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed slowdown compared to the baseline.')
+    args = parser.parse_args()
+
+    use_offline_taxonomy()
+    results = []
+
+    for version in args.resources:
+        if not args.skip_parser:
+            seconds = bench_parser(version, 1)
+            results.append({'name': 'run_eucast_parser', 'resource': version,
+                            'rows': None, 'samples': None, 'seconds': seconds})
+            print('run_eucast_parser ({}): {:.3f}s'.format(version, seconds))
+
+        for size in args.sizes:
+            table = synthetic_mics(size)
+            timings = bench_ruler(version, table, args.processes, args.repeats)
+            for name, seconds in timings.items():
+                results.append({'name': name, 'resource': version, 'rows': len(table),
+                                'samples': int(table.sample_id.nunique()),
+                                'seconds': seconds})
+                print('{} ({}, {} rows): {:.3f}s'.format(name, version, len(table), seconds))
+
+    report = {'python': platform.python_version(), 'pandas': pd.__version__,
+              'numpy': np.__version__, 'processes': args.processes,
+              'repeats': args.repeats, 'results': results}
+    with open(args.out, 'w', encoding='UTF-8') as f_handle:
+        json.dump(report, f_handle, indent=1)
+
+    if args.baseline is not None and compare(results, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
 from pymicruler.bp.EucastParser import EucastParser
+from pymicruler.bp.TaxonomyHandler import TaxonomyHandler
 
 import os
 
@@ -38,3 +39,7 @@ if not os.path.exists(results_directory):
     os.makedirs(results_directory)
 
 eucast_9_0.to_excel(path_to_parser_outfile, index=False)
+
+# export the lineages of all referenced organisms next to the parsed table, so queries
+# against it do not need the NCBI taxonomy database for these organisms
+TaxonomyHandler.export_lineage_snapshot(eucast_9_0, path_to_parser_outfile)
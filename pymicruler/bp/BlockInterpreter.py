@@ -11,6 +11,7 @@ class BlockInterpreter:
         self.phen_groups = util.read_in_reference_dict('phen_groups')
         self.translations = pd.read_excel(util.Path.RENAME.value)
         self.table = pd.DataFrame()
+        self.new_rows = []
         self.note_ana = np.NaN
 
     def run_block_interpreter(self, table, note_analysis):
@@ -26,6 +27,7 @@ class BlockInterpreter:
         """
         self.note_ana = note_analysis
         self.table = table.reset_index(drop=True)
+        self.new_rows = []
         self.table['drop_row'] = np.NaN
         self.table['indication'] = np.NaN
 
@@ -77,24 +79,24 @@ class BlockInterpreter:
 
         for idx, row in exception_table.iterrows():
             # match streptococcus groups:
-            match = re.search(util.ExcRegex.STREP.value, row.restrictions)
+            match = util.compiled(util.ExcRegex.STREP.value).search(row.restrictions)
             if match is not None:
                 self._translate_streptococcus(idx, row.restrictions, exception_table)
                 continue
 
             # match single species restriction:
-            match = re.search(util.ExcRegex.SNG.value, row.restrictions)
+            match = util.compiled(util.ExcRegex.SNG.value).search(row.restrictions)
             if match is not None:
-                exception_table.loc[idx, 'organism'] = row.restrictions
-                self.table = self.table.append(exception_table.loc[idx],
-                                               verify_integrity=True,
-                                               ignore_index=True)
+                new_row = exception_table.loc[idx].copy()
+                new_row.loc['organism'] = row.restrictions
+                self.new_rows.append(new_row)
                 continue
 
             # match composed restrictions
             entry = row.restrictions.replace('\n', '')
-            components = re.split(util.ExcRegex.COMP.value, entry)
+            components = util.compiled(util.ExcRegex.COMP.value).split(entry)
             self._duplicate_rows(idx, exception_table, components)
+        self._add_new_rows()
 
     def _process_parentheses(self):
         """
@@ -146,9 +148,21 @@ class BlockInterpreter:
             org_exception = None
         return org, org_exception
 
+    def _add_new_rows(self):
+        """
+        Adds all rows collected since the last call to the table at once.
+        """
+        if len(self.new_rows) == 0:
+            return
+        new_rows = pd.DataFrame(self.new_rows, columns=self.table.columns)
+        self.table = pd.concat((self.table, new_rows),
+                               ignore_index=True, sort=False)
+        self.new_rows = []
+
     def _duplicate_rows(self, idx, table, org_list):
         """
-        Adds copies of guidelines which were applicable to multiple organisms.
+        Collects copies of guidelines which were applicable to multiple
+        organisms, they are added to the table by _add_new_rows.
 
         :param idx: row index of the guideline that should be duplicated
         :type: Integer
@@ -163,7 +177,7 @@ class BlockInterpreter:
             row.loc['organism'] = org
             if exc is not None:
                 row.loc['exception'] = exc
-            self.table = self.table.append(row, verify_integrity=True, ignore_index=True)
+            self.new_rows.append(row.copy())
 
     def _process_notes(self):
         """
@@ -178,6 +192,7 @@ class BlockInterpreter:
                 note_info = self.note_ana.get_note_information(note_list[int(
                     num)-1], row.organism, row.cmp_name)
                 self._analyse_note_info(note_info, idx)
+        self._add_new_rows()
         self.table = self.table[self.table.drop_row != 1]
 
     def _analyse_note_info(self, info_dict, idx):
@@ -258,7 +273,7 @@ class BlockInterpreter:
 
     def _add_new_bp(self, text):
         """
-        Adds a new breakpoint base don information derived from the notes.
+        Collects a new breakpoint based on information derived from the notes.
 
         :param text: Breakpoint information as derived from the interpretation dict.
         :type: String
@@ -270,8 +285,7 @@ class BlockInterpreter:
             's_value': bp[2]
         }
         new_row['r_value'] = bp[3] if len(new_row) > 3 else bp[2]
-        self.table = self.table.append(new_row, verify_integrity=True,
-                                       ignore_index=True)
+        self.new_rows.append(new_row)
 
     def _replace_phen_groups(self):
         """
@@ -295,6 +309,7 @@ class BlockInterpreter:
                         phen = phen[phen.cmp_name != name]
                 for idx, row in phen.iterrows():
                     self._duplicate_rows(idx, phen, species_list)
+                self._add_new_rows()
 
     def _find_existing_breakpoints(self, df, phen_list):
         """
@@ -326,7 +341,7 @@ class BlockInterpreter:
         :param table: Data table containing the guideline
         :type: Pandas DataFrame
         """
-        match = re.findall(util.Regex.STREP.value, entry)
+        match = util.compiled(util.Regex.STREP.value).findall(entry)
         org_list = ['Group ' + x for x in match]
         self._duplicate_rows(idx, table, org_list)
 
@@ -340,6 +355,7 @@ class BlockInterpreter:
         self.table = self.table[~mask].reset_index(drop=True)
         for idx, row in strep.iterrows():
             self._translate_streptococcus(idx, row.organism, strep)
+        self._add_new_rows()
 
         # Split two species within one entry
         mask = self.table.organism.str.contains(util.Regex.SEP.value,
@@ -347,9 +363,10 @@ class BlockInterpreter:
         sep = self.table[mask].reset_index(drop=True)
         self.table = self.table[~mask].reset_index(drop=True)
         for idx, row in sep.iterrows():
-            components = re.split(util.ExcRegex.COMP.value, row.organism)
+            components = util.compiled(util.ExcRegex.COMP.value).split(row.organism)
             components[1] = components[0].split(' ')[0] + ' ' + components[1]
             self._duplicate_rows(idx, sep, components)
+        self._add_new_rows()
 
         # Remove spp.
         self.table.organism = self.table.organism.apply(
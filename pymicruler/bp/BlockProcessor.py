@@ -8,6 +8,10 @@ from pymicruler.utils import util
 
 
 class BlockProcessor:
+    # Combined pattern of all tokens of a compound entry, one named group per token
+    TOKENIZER = re.compile('|'.join(
+        '(?P<{}>{})'.format(x, util.CmpRegex[x].value) for x in util.CmpRegex.TOKENS.value))
+
     def __init__(self):
         self.breakpoints = pd.DataFrame(columns=util.Cols.PROC.value)
         self.note_text = ''
@@ -87,10 +91,10 @@ class BlockProcessor:
         notes = self.block.notes.astype(str).str.replace(u'\xa0', ' ')
         self.block.notes = notes.replace('nan', np.NaN)
 
-        for idx, row in self.block.notes.iteritems():
+        for idx, row in self.block.notes.items():
             if pd.isna(row):
                 continue
-            elif re.search(util.Regex.PNT.value, row) is not None:
+            elif util.compiled(util.Regex.PNT.value).search(row) is not None:
                 self.note_text = row
 
     def _process_note_text(self):
@@ -101,7 +105,7 @@ class BlockProcessor:
             return
         else:
             all_notes = self.note_text.split('\n')
-            res = [re.match(util.Regex.PNT.value, x) for x in all_notes]
+            res = [util.compiled(util.Regex.PNT.value).match(x) for x in all_notes]
             for idx in range(len(res)):
                 if res[idx] is None:
                     if all_notes[idx][:5].find('.') != -1:
@@ -132,7 +136,7 @@ class BlockProcessor:
         for idx, row in incmplt_rows.iterrows():
             # if note text is split between two lines it is added to the notes
             if pd.notna(row.iloc[-1]):
-                match = re.search(util.Regex.PNT.value, row.notes)
+                match = util.compiled(util.Regex.PNT.value).search(row.notes)
                 if match is not None:
                     self.note_list.append(row.notes[match.end():].strip(' '))
                 self.block.at[idx, 'notes'] = np.NaN
@@ -163,10 +167,9 @@ class BlockProcessor:
         r_result = pd.DataFrame(
             r_result.values.tolist(), columns=['r_value', 'r_ss'])
 
-        compound_result = self.block.cmp_name.apply(
-            lambda x: self._process_compound(x))
         compound_result = pd.DataFrame(
-            compound_result.values.tolist(), columns=util.Cols.BODY.value)
+            [self._process_compound(x) for x in self.block.cmp_name],
+            columns=util.Cols.BODY.value)
 
         if self.block_he == 1:
             compound_result.high_exposure = 1
@@ -207,37 +210,19 @@ class BlockProcessor:
         information that restricts applicability, he: high exposure (dosis).
         :rtype: String or None
         """
-        par = np.NaN
-        roa = np.NaN
-        ss = np.NaN
-        he = np.NaN
-
-        # content of parentheses
-        match = re.search(util.CmpRegex.PAR.value, entry)
-        if match is not None:
-            par = match.group()[1:-1]
-            entry = entry[:match.start()] + entry[match.end():]
-
-        # information about the route of administration
-        match = re.search(util.CmpRegex.ROA.value, entry)
-        if match is not None:
-            roa = match.group()
-            entry = entry[:match.start()] + entry[match.end():]
-
-        # indicator of high exposure
-        match = re.search(util.CmpRegex.HE.value, entry)
-        if match is not None:
-            entry = entry[:match.start()] + entry[match.end():]
-            he = 1
-
-        # superscript
-        match = re.search(util.CmpRegex.SS.value, entry)
-        if match is not None:
-            ss = match.group().strip('§,')
-            entry = entry[:match.start()] + entry[match.end():]
-
-        # separate any restrictions from compound name
-        match = re.search(util.CmpRegex.CMP.value, entry)
+        tokens = BlockProcessor._find_compound_tokens(entry)
+        par = tokens['PAR'].group()[1:-1] if 'PAR' in tokens else np.NaN
+        roa = tokens['ROA'].group() if 'ROA' in tokens else np.NaN
+        he = 1 if 'HE' in tokens else np.NaN
+        ss = tokens['SS'].group().strip('§,') if 'SS' in tokens else np.NaN
+
+        # remove all tokens and separate any restrictions from compound name
+        spans = sorted(x.span() for x in tokens.values())
+        starts = [0] + [x[1] for x in spans]
+        ends = [x[0] for x in spans] + [len(entry)]
+        entry = ''.join(entry[start:end] for start, end in zip(starts, ends))
+
+        match = util.compiled(util.CmpRegex.CMP.value).search(entry)
         cmp = match.group()
         restriction = entry[:match.start()] + entry[match.end():].strip(' \n,')
         if len(restriction) < 1:
@@ -245,6 +230,33 @@ class BlockProcessor:
 
         return cmp, par, roa, ss, restriction, he
 
+    @classmethod
+    def _find_compound_tokens(cls, entry):
+        """
+        Scans a compound entry once for the content of parentheses, the route
+        of administration, high exposure and superscript. Only the first
+        occurrence of each token is kept, if tokens start at the same position
+        they are matched in the order of util.CmpRegex.TOKENS.
+
+        :param entry: Compound name as specified in the EUCAST table.
+        :type: String
+        :return: First match of each token found in the entry
+        :rtype: Dictionary
+        """
+        tokens = dict()
+        pos = 0
+        while len(tokens) < len(util.CmpRegex.TOKENS.value):
+            match = cls.TOKENIZER.search(entry, pos)
+            if match is None:
+                break
+            if match.lastgroup in tokens:
+                # continue inside the repeated token, it may contain other tokens
+                pos = match.start() + 1
+                continue
+            tokens[match.lastgroup] = match
+            pos = match.end()
+        return tokens
+
     def _process_superscript(self):
         """
         Gathers all superscript notations used in different columns
@@ -1,23 +1,272 @@
 import pandas as pd
 from pymicruler.bp.TaxonomyHandler import TaxonomyHandler as TH
+from pymicruler.bp.ResourceCache import ResourceCache
+from pymicruler.bp.SampleStream import SampleStream
+from pymicruler.bp.Vocabulary import Vocabulary
 from pymicruler.bp import RuleBasedEngine
 from pymicruler.utils import util
+from pymicruler.utils.metrics import StageMetrics
 
 import numpy as np
 import sys
+import threading
 
 
 class BpRuler:
-    def __init__(self):
+    def __init__(self, processes=None, chunk_size=16, metrics=None):
+        """
+        :param processes: Number of worker processes for the rule-based
+        engine. By default the engine runs in the current process.
+        :type: Integer
+        :param chunk_size: Number of samples sent to a worker process at once.
+        :type: Integer
+        :param metrics: Collects wall time, rows and cache hits per stage. A
+        new collector is created by default.
+        :type: StageMetrics
+        """
+        self._local = threading.local()
+        self._lock = threading.Lock()
         self.resource = pd.DataFrame()
+        self.bp_index = None
+        self.vocabulary = None
+        self.engine = None
+        self.processes = processes
+        self.chunk_size = chunk_size
+        self.lineages = dict()
+        self.metrics = metrics if metrics is not None else StageMetrics()
+        self.rule_stats = None
         self.unknown_entries = pd.DataFrame()
         pd.options.mode.chained_assignment = None
 
+    @classmethod
+    def from_resource(cls, resource, processes=None, chunk_size=16):
+        """
+        Creates a long-lived ruler that loads and indexes the guidelines, their
+        lineage snapshot and the compound reference data once. Afterwards any
+        number of query/classify/phenotype calls can be served without
+        passing the resource again, also from several threads at once. Only
+        the guidelines, breakpoint index and vocabulary are shared between
+        calls. Each call works on its own copy of the input and its own
+        intermediate tables, every thread gets its own rule-based engine and
+        unknown_report and query_stats refer to the last call of the thread.
+
+        :param resource: Path to parsed Eucast guidelines table.
+        :type: String
+        :param processes: Number of worker processes for the rule-based
+        engine. By default the engine runs in the current process.
+        :type: Integer
+        :param chunk_size: Number of samples sent to a worker process at once.
+        :type: Integer
+        :return: Ruler with preloaded guidelines
+        :rtype: BpRuler
+        """
+        session = cls(processes, chunk_size)
+        session.resource, session.bp_index = ResourceCache.load(resource)
+        TH.load_lineage_snapshot(resource)
+        session.vocabulary = Vocabulary(session.resource, TH.get_all_cmps())
+        session.thread_engine()
+        return session
+
+    @property
+    def unknown_report(self):
+        """
+        Organisms and compounds of the last call in the current thread that
+        could not be found.
+
+        :return: Type, name and number of rows for every unknown name
+        :rtype: Pandas DataFrame
+        """
+        if not hasattr(self._local, 'unknown_report'):
+            self._local.unknown_report = pd.DataFrame(columns=util.Cols.UNKNOWN.value)
+        return self._local.unknown_report
+
+    @unknown_report.setter
+    def unknown_report(self, report):
+        self._local.unknown_report = report
+
+    @property
+    def query_stats(self):
+        """
+        Statistics of the last breakpoint query in the current thread.
+
+        :return: Number of rows, organisms, TaxIDs, queried rows and pairs
+        :rtype: Dictionary
+        """
+        if not hasattr(self._local, 'query_stats'):
+            self._local.query_stats = dict()
+        return self._local.query_stats
+
+    @query_stats.setter
+    def query_stats(self, stats):
+        self._local.query_stats = stats
+
+    def thread_engine(self):
+        """
+        Returns the rule-based engine of the current thread, it is created on
+        first use. Engines keep the facts of the analysed sample and are
+        therefore never shared between threads.
+
+        :return: Engine of the current thread
+        :rtype: BacterialResistance
+        """
+        engine = getattr(self._local, 'engine', None)
+        if engine is None:
+            engine = RuleBasedEngine.BacterialResistance()
+            self._local.engine = engine
+        return engine
+
+    def query(self, query_table):
+        """
+        Looks up breakpoints for the query table with the preloaded guidelines.
+
+        :param query_table: Data frame containing organisms and compounds to
+        query
+        :type: Pandas DataFrame
+        :return: Query table updated with result column.
+        :rtype: Pandas DataFrame
+        """
+        return self._run_session('run_breakpoint_query', query_table)
+
+    def classify(self, sample_data):
+        """
+        Classifies AST results with the preloaded guidelines.
+
+        :param sample_data: Data to be analysed containing analysed organism,
+        compound names and MICs.
+        :type: Pandas DataFrame
+        :return: Orginal table updated with resistance classification
+        :rtype: Pandas DataFrame
+        """
+        return self._run_session('run_sample_classification', sample_data)
+
+    def phenotype(self, sample_data):
+        """
+        Retrieves the whole resistance phenotype with the preloaded guidelines.
+
+        :param sample_data: Data to be analysed containing analysed organism,
+        compound names, MICs and sample IDs.
+        :type: Pandas DataFrame
+        :return: Table of all derived resistance phenotypes
+        :rtype: Pandas DataFrame
+        """
+        return self._run_session('get_whole_resistance_phenotype', sample_data)
+
+    def classify_chunks(self, source, rows_per_chunk=100000):
+        """
+        Classifies AST results chunk by chunk with the preloaded guidelines.
+        All rows of a sample are classified together, the input has to be
+        sorted by sample_id. After the last chunk unknown_report summarises
+        the unknown entries and query_stats the summed statistics of all
+        chunks.
+
+        :param source: Path to a CSV/Parquet file or iterable of data frames
+        :type: String/Iterable
+        :param rows_per_chunk: Number of rows read at once from files
+        :type: Integer
+        :return: Classified chunks
+        :rtype: Generator
+        """
+        reports = []
+        stats = dict()
+        for chunk in SampleStream.read_samples(source, rows_per_chunk):
+            yield self._run_session('run_sample_classification', chunk)
+            reports.append(self.unknown_report)
+            for key, value in self.query_stats.items():
+                stats[key] = stats.get(key, 0) + value
+        self.query_stats = stats
+
+        if len(reports) > 0:
+            self.unknown_report = pd.concat(reports).groupby(
+                ['type', 'name'], sort=False).rows.sum().reset_index()
+
+    def classify_to_csv(self, source, out_path, rows_per_chunk=100000):
+        """
+        Classifies AST results chunk by chunk and appends the results of each
+        chunk to a CSV file.
+
+        :param source: Path to a CSV/Parquet file or iterable of data frames
+        :type: String/Iterable
+        :param out_path: Path of the output file
+        :type: String
+        :param rows_per_chunk: Number of rows read at once from files
+        :type: Integer
+        :return: Number of written rows
+        :rtype: Integer
+        """
+        n_rows = 0
+        columns = None
+        for output_table in self.classify_chunks(source, rows_per_chunk):
+            if columns is None:
+                columns = list(output_table)
+                output_table.to_csv(out_path, index=False)
+            else:
+                output_table.reindex(columns=columns).to_csv(
+                    out_path, mode='a', header=False, index=False)
+            n_rows += len(output_table)
+        return n_rows
+
+    def _run_session(self, method, table):
+        """
+        Runs one analysis on a copy of the table with a fresh ruler and keeps
+        its report of unknown entries and query statistics.
+
+        :param method: Name of the analysis method
+        :type: String
+        :param table: Data to be analysed
+        :type: Pandas DataFrame
+        :return: Result of the analysis
+        :rtype: Pandas DataFrame
+        """
+        run = self._new_run()
+        output_table = getattr(run, method)(None, table.copy())
+        self.unknown_report = run.unknown_report
+        self.query_stats = run.query_stats
+        if run.rule_stats is not None and self.rule_stats is not None:
+            with self._lock:
+                self.rule_stats.merge(run.rule_stats)
+        return output_table
+
+    def _new_run(self):
+        """
+        Creates a ruler for a single call that shares the preloaded guidelines
+        and metrics of this session and uses the engine of the current thread.
+        Rule statistics are collected separately and merged after the call.
+
+        :return: Ruler without any sample specific state
+        :rtype: BpRuler
+        """
+        run = BpRuler(self.processes, self.chunk_size, self.metrics)
+        run.resource = self.resource
+        run.bp_index = self.bp_index
+        run.vocabulary = self.vocabulary
+        run.engine = self.thread_engine()
+        if self.rule_stats is not None:
+            run.rule_stats = RuleBasedEngine.RuleStats()
+        return run
+
+    def _load_resource(self, resource):
+        """
+        Loads the guidelines and their lineage snapshot unless a preloaded
+        resource should be used.
+
+        :param resource: Path to parsed Eucast guidelines table or None to
+        use the guidelines of the session.
+        :type: String/None
+        """
+        if resource is not None:
+            with self.metrics.stage('load_resource', cache=ResourceCache.memory.info):
+                self.resource, self.bp_index = ResourceCache.load(resource)
+                TH.load_lineage_snapshot(resource)
+                self.vocabulary = Vocabulary(self.resource, TH.get_all_cmps())
+        elif self.bp_index is None:
+            raise ValueError('No guidelines were loaded, use BpRuler.from_resource(path).')
+
     def run_breakpoint_query(self, resource, query_table, ana_type='bp'):
         """
         Looks up breakpoints based on the provided guidelines and query table.
 
-        :param resource: Path to parsed Eucast guidelines table.
+        :param resource: Path to parsed Eucast guidelines table or None if
+        the guidelines were preloaded via from_resource.
         :type: String
         :param query_table: Data frame containing organisms and compounds to
         query
@@ -28,19 +277,17 @@ class BpRuler:
         :return: Query table updated with result column.
         :rtype: Pandas DataFrame
         """
-        self.resource = pd.read_excel(resource)
+        self._load_resource(resource)
         self._prepare_query_data(query_table, ana_type)
 
-        query_mask = self.sample.apply(
-            lambda x: pd.isna(x.matched_organism) and pd.isna(x.matched_cmp_name),
-            axis=1)
-
-        self.sample[['s_value', 'r_value', 'matched_organism', 'matched_cmp_name']] = \
-            self.sample[query_mask].apply(
-                lambda x: pd.Series(self._bp_look_up(x.lineage, x.cmp_name)), axis=1)
+        query_mask = (pd.isna(self.sample.matched_organism)
+                      & pd.isna(self.sample.matched_cmp_name)).values
+        with self.metrics.stage('breakpoints', rows=int(query_mask.sum())):
+            self._resolve_breakpoints(query_mask)
 
         if ana_type == 'bp':
-            output_table = self._prepare_output(ana_type)
+            with self.metrics.stage('prepare_output', rows=len(self.sample)):
+                output_table = self._prepare_output(ana_type)
             return output_table
 
     def run_sample_classification(self, resource, sample_data, ana_type='classify'):
@@ -58,18 +305,22 @@ class BpRuler:
         :rtype: Pandas DataFrame
         """
         self.run_breakpoint_query(resource, sample_data, ana_type)
-        self._run_classification()
+        with self.metrics.stage('classification', rows=len(self.sample)):
+            self._run_classification()
 
         if ana_type == 'classify' \
                 and pd.isna(self.sample.label).any() \
                 and 'sample_id' in list(self.sample):
 
             rbe_df = self._reduce_to_incomplete_samples()
-            results = RuleBasedEngine.run_rbe(rbe_df)
+            results = self._run_rbe(rbe_df)
 
-            self._process_classification_results_rbe(rbe_df, results)
-            output_table = self._prepare_output(ana_type)
+            with self.metrics.stage('rule_results', rows=len(results)):
+                self._process_classification_results_rbe(rbe_df, results)
 
+        if ana_type == 'classify':
+            with self.metrics.stage('prepare_output', rows=len(self.sample)):
+                output_table = self._prepare_output(ana_type)
             return output_table
 
     def get_whole_resistance_phenotype(self, resource, sample_data):
@@ -90,10 +341,12 @@ class BpRuler:
         self.run_sample_classification(resource, sample_data, ana_type)
 
         rbe_df = self.sample.groupby('sample_id')
-        results = RuleBasedEngine.run_rbe(rbe_df)
+        results = self._run_rbe(rbe_df)
 
-        self._process_whole_phenotype(rbe_df, results)
-        output_table = self._prepare_output(ana_type)
+        with self.metrics.stage('rule_results', rows=len(results)):
+            self._process_whole_phenotype(rbe_df, results)
+        with self.metrics.stage('prepare_output', rows=len(self.sample)):
+            output_table = self._prepare_output(ana_type)
 
         return output_table
 
@@ -109,15 +362,19 @@ class BpRuler:
         self.sample = sample
         self._column_qc(ana_type)
 
-        self.sample['lineage'] = np.NaN
         self.sample.MIC = self.sample.MIC.astype(float)
 
-        missing_orgs, missing_cmps = TH.run_quality_check(self.sample)
-        if any((missing_cmps, missing_orgs)):
+        with self.metrics.stage('quality_check', rows=len(self.sample),
+                                cache=self._taxid_counters):
+            missing_orgs, missing_cmps = TH.run_quality_check(self.sample, verbose=False)
             self._handle_missing_information(missing_orgs, missing_cmps)
+            self.sample = self.vocabulary.encode(self.sample)
 
-        self._get_taxids()
-        self._get_lineages()
+        with self.metrics.stage('taxids', rows=len(self.sample), cache=self._taxid_counters):
+            self._get_taxids()
+        with self.metrics.stage('lineages', rows=len(self.sample),
+                                cache=self._lineage_counters):
+            self._get_lineages()
 
     def _column_qc(self, ana_type):
         """
@@ -151,84 +408,153 @@ class BpRuler:
 
     def _get_taxids(self):
         """
-        Looks up TaxIDs for all organisms to be analysed
+        Looks up TaxIDs for all organisms to be analysed and assigns them via
+        the category codes of the organism column.
         """
-        all_org_ids = TH.translate_all(self.sample.organism.unique())
+        organisms = self.sample.organism.cat.categories
+        all_org_ids = TH.translate_all(organisms)
+        self.query_stats['rows'] = len(self.sample)
+        self.query_stats['organisms'] = len(organisms)
 
-        for key, value in all_org_ids.items():
-            self.sample.loc[self.sample.organism == key, 'organism_id'] = value[0]
+        taxids = [all_org_ids[x][0] if x in all_org_ids else np.nan for x in organisms]
+        taxids = np.array(taxids + [np.nan], dtype=float)
+        self.sample['organism_id'] = taxids[self.sample.organism.cat.codes.values]
 
     def _handle_missing_information(self, orgs, cmps):
         """
-        Marks entries where compound names or organism names could not be found.
+        Moves entries whose organism or compound name could not be found to the
+        unknown entries and summarises them in the unknown report. Compounds
+        with guidelines in the resource are kept.
+
+        :param orgs: Organisms that could not be found in the taxonomy
+        :type: Numpy ndarray/None
+        :param cmps: Compounds that could not be found in the compound dictionary
+        :type: List/None
         """
-        if orgs is not None:
-            mask = self.sample.apply(lambda x: x.organism in orgs, axis=1)
-            self.unknown_entries = self.sample[mask]
-            self.unknown_entries.matched_organism = 'Organism not found'
-            self.sample = self.sample[~mask]
+        orgs = [x for x in orgs if x is not None] if orgs is not None else []
+        cmps = set(cmps if cmps is not None else []).difference(self.resource.cmp_name)
+
+        org_mask = self.sample.organism.isin(orgs)
+        cmp_mask = self.sample.cmp_name.isin(cmps) & ~org_mask
 
-        if cmps is not None:
-            mask = self.sample.apply(lambda x: x.organism in cmps, axis=1)
-            unknown_entries = self.sample[mask]
-            unknown_entries.matched_cmp_name = 'Compound not found'
-            self.unknown_entries = pd.concat((self.unknown_entries, unknown_entries))
-            self.sample = self.sample[~mask]
+        unknown_orgs = self.sample[org_mask].copy()
+        unknown_orgs['matched_organism'] = 'Organism not found'
+        unknown_cmps = self.sample[cmp_mask].copy()
+        unknown_cmps['matched_cmp_name'] = 'Compound not found'
 
-        self.sample = self.sample.reset_index(drop=True)
+        self.unknown_report = pd.concat((
+            self._summarise_unknown(unknown_orgs.organism, 'organism'),
+            self._summarise_unknown(unknown_cmps.cmp_name, 'compound')),
+            ignore_index=True)
+
+        if org_mask.any() or cmp_mask.any():
+            self.unknown_entries = pd.concat((unknown_orgs, unknown_cmps))
+            self.sample = self.sample[~(org_mask | cmp_mask)].reset_index(drop=True)
+
+    @staticmethod
+    def _summarise_unknown(names, entry_type):
+        """
+        Counts the affected rows for every unknown name.
+
+        :param names: Unknown organism or compound names of all affected rows
+        :type: Pandas Series
+        :param entry_type: Type of the names (organism/compound)
+        :type: String
+        :return: Type, name and number of rows for every unknown name
+        :rtype: Pandas DataFrame
+        """
+        counts = names.value_counts(sort=False)
+        return pd.DataFrame({'type': entry_type, 'name': counts.index, 'rows': counts.values},
+                            columns=util.Cols.UNKNOWN.value)
 
     def _get_lineages(self):
         """
-        Looks up lineages for all organisms to be analysed
+        Looks up lineages for all organisms to be analysed and stores them once
+        per TaxID, rows refer to them via their organism_id.
         """
         all_orgs = self.sample.loc[pd.isna(self.sample.matched_organism), 'organism_id'].unique()
         lineages = TH.get_all_lineages(all_orgs)
 
-        self.sample = self.sample.astype('object')
+        self.lineages = {org: tuple(lineage) for org, lineage in zip(all_orgs, lineages)}
+        self.query_stats['taxids'] = len(self.lineages)
 
-        for org, lineage in zip(all_orgs, lineages):
-            for idx, row in self.sample.loc[self.sample.organism_id == org].iterrows():
-                self.sample.loc[idx, 'lineage'] = lineage
+    def _resolve_breakpoints(self, query_mask):
+        """
+        Collapses the queried rows to distinct pairs of TaxID and compound
+        category code, resolves breakpoints once per pair and scatters the
+        results back to all rows via their pair number.
 
-    def _bp_look_up(self, lineage, cmp_name):
+        :param query_mask: Rows that should be queried
+        :type: Numpy ndarray
         """
-        Searches for applicable breakpoints for a given lineage and compound
+        queried = self.sample.loc[query_mask, ['organism_id', 'cmp_name']]
+        queried = queried.fillna({'organism_id': -1})
+        keys = pd.DataFrame({'organism_id': queried.organism_id.values,
+                             'cmp_code': queried.cmp_name.cat.codes.values})
 
-        :param lineage: Taxonomic lineage of the queried organism
-        :type: List
-        :param cmp_name: Compound the organism was tested for
-        :type: String
-        :return: Result of query
-        :rtype: Dictionary/None
+        pair_ids = keys.groupby(['organism_id', 'cmp_code'], sort=False).ngroup().values
+        pairs = queried[~keys.duplicated().values]
+        resolved = self.bp_index.resolve(pairs, self.lineages)
+
+        self.query_stats['queried_rows'] = len(queried)
+        self.query_stats['pairs'] = len(pairs)
+
+        for column in util.Cols.ADDED_BP.value:
+            self.sample.loc[query_mask, column] = resolved[column].values[pair_ids]
+
+    def _run_rbe(self, rbe_df):
         """
-        for org in reversed(lineage):
-            result = self.resource.query('organism == @org and cmp_name == @cmp_name')
-            if len(result) > 0:
-                result = result.iloc[0]
-                if pd.notna(result['exception']) and result['exception'] in lineage:
-                    continue
-                else:
-                    res = [float(result.s_value), float(result.r_value),
-                           result.organism, result.cmp_name]
-                    return res
-        else:
-            res = [None]*4
-        return res
+        Runs the rule-based engine for grouped samples. If rule_stats is set,
+        firing statistics of all rules are collected in it.
+
+        :param rbe_df: Data to be analysed in the rule based engine
+        :type: Pandas DataframeGroupby
+        :return: Results of the rule-based engine for each of the samples.
+        :rtype: List
+        """
+        with self.metrics.stage('rule_engine', rows=rbe_df.ngroups,
+                                cache=RuleBasedEngine.outcome_cache.info):
+            return RuleBasedEngine.run_rbe(
+                rbe_df, self.engine, processes=self.processes, chunk_size=self.chunk_size,
+                rule_stats=self.rule_stats)
+
+    @staticmethod
+    def _taxid_counters():
+        """
+        Counts TaxID lookups answered by the caches or a lineage snapshot.
+
+        :return: Hits and misses
+        :rtype: Dictionary
+        """
+        info = TH.cache_info()
+        return {'hits': info['taxids']['hits'] + info['snapshot_hits'],
+                'misses': info['taxids']['misses']}
+
+    @staticmethod
+    def _lineage_counters():
+        """
+        Counts lineage lookups answered by the caches or a lineage snapshot.
+
+        :return: Hits and misses
+        :rtype: Dictionary
+        """
+        info = TH.cache_info()
+        return {'hits': info['lineages']['hits'] + info['snapshot_hits'],
+                'misses': info['lineages']['misses']}
 
     def _run_classification(self):
         """
-        Classifies AST result based on breakpoint and MIC.
+        Classifies AST results based on breakpoints and MICs for the whole
+        table at once. Entries without breakpoint remain unlabelled.
         """
-        for idx, row in self.sample.iterrows():
-            if pd.isna(row.r_value):
-                self.sample.loc[idx, 'label'] = np.NaN
-            else:
-                if row.MIC > row.r_value:
-                    self.sample.loc[idx, 'label'] = 'R'
-                elif row.MIC <= row.s_value:
-                    self.sample.loc[idx, 'label'] = 'S'
-                else:
-                    self.sample.loc[idx, 'label'] = 'I'
+        mic = self.sample.MIC.astype(float).values
+        s_value = self.sample.s_value.astype(float).values
+        r_value = self.sample.r_value.astype(float).values
+
+        labels = np.select((mic > r_value, mic <= s_value), ('R', 'S'),
+                           default='I').astype(object)
+        labels[np.isnan(r_value)] = np.nan
+        self.sample['label'] = labels
 
     def _reduce_to_incomplete_samples(self):
         """
@@ -239,7 +565,7 @@ class BpRuler:
         """
         samples_for_rbe = self.sample[pd.isna(self.sample.label)].sample_id.unique()
 
-        self.sample['incmplt'] = self.sample.apply(lambda x: x.sample_id in samples_for_rbe, axis=1)
+        self.sample['incmplt'] = self.sample.sample_id.isin(samples_for_rbe)
         rbe_df = self.sample[self.sample.incmplt]
 
         groups = rbe_df.groupby('sample_id')
@@ -265,11 +591,13 @@ class BpRuler:
     def _process_whole_phenotype(self, rbe_df, results):
         """
         Adds any new resistance labels found by the rule-based engine to the output table.
+        New rows are collected and appended at once.
 
         :param rbe_df: Data analysed in the rule based engine
         :type: Pandas DataframeGroupby
         :param results: Results of the rule-based engine for each of the samples.
         """
+        new_rows = []
         for group, result in zip(rbe_df, results):
             if len(result) > 0:
                 for key, value in result.items():
@@ -277,13 +605,13 @@ class BpRuler:
                         pos = group[1][group[1].cmp_name == key].index
                         self.sample.loc[pos, 'label'] = value
                     else:
-                        new_row = pd.Series({'organism': group[1].organism.iloc[0],
-                                             'cmp_name': key,
-                                             'label': value,
-                                             'sample_id': group[1].sample_id.iloc[0]
-                                             })
-                        self.sample = self.sample.append(
-                            new_row, ignore_index=True, verify_integrity=True)
+                        new_rows.append({'organism': group[1].organism.iloc[0],
+                                         'cmp_name': key,
+                                         'label': value,
+                                         'sample_id': group[1].sample_id.iloc[0]
+                                         })
+        if len(new_rows) > 0:
+            self.sample = pd.concat((self.sample, pd.DataFrame(new_rows)), ignore_index=True)
 
     def _prepare_output(self, ana_type):
         """
@@ -295,7 +623,8 @@ class BpRuler:
         """
         self.sample.loc[pd.isna(self.sample.matched_organism),
                         'matched_organism'] = 'Breakpoint not found'
-        output_table = self.sample.drop(util.Cols.RULER_DROP_ELSE.value, axis=1)
+        output_table = Vocabulary.decode(
+            self.sample.drop(util.Cols.RULER_DROP_ELSE.value, axis=1))
 
         if ana_type == 'classify' and 'incmplt' in list(output_table):
             output_table = output_table.drop('incmplt', axis=1)
@@ -0,0 +1,147 @@
+import pandas as pd
+from pandas.api.types import CategoricalDtype
+
+
+class BreakpointIndex:
+    def __init__(self, resource):
+        """
+        Compiles a parsed Eucast guideline table into a hash index keyed on
+        organism-compound combinations.
+
+        :param resource: Parsed Eucast guidelines table.
+        :type: Pandas DataFrame
+        """
+        self.entries = dict()
+        self._build_index(resource)
+        self.table = pd.DataFrame(
+            list(self.entries.values()),
+            columns=['s_value', 'r_value', 'matched_organism', 'matched_cmp_name', 'exception'])
+        names = set(self.table.matched_organism).union(self.table.exception.dropna())
+        self.organisms = CategoricalDtype(sorted(names))
+        self.table['organism_code'] = self._encode(self.table.matched_organism, self.organisms)
+        self.table['exception_code'] = self._encode(self.table.exception, self.organisms)
+        self._compounds = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _build_index(self, resource):
+        """
+        Stores the first guideline found for every organism-compound
+        combination together with its pre-resolved exception.
+
+        :param resource: Parsed Eucast guidelines table.
+        :type: Pandas DataFrame
+        """
+        if 'exception' in list(resource):
+            exceptions = resource.exception
+        else:
+            exceptions = [None] * len(resource)
+
+        for org, cmp_name, s_value, r_value, exception in zip(
+                resource.organism, resource.cmp_name, resource.s_value,
+                resource.r_value, exceptions):
+            key = (org, cmp_name)
+            if key in self.entries:
+                continue
+            exception = exception if pd.notna(exception) else None
+            self.entries[key] = (float(s_value), float(r_value), org,
+                                 cmp_name, exception)
+
+    @staticmethod
+    def _encode(values, dtype):
+        """
+        Returns the category codes of names, unknown names get the code -1.
+
+        :param values: Names to encode
+        :type: Pandas Series/List
+        :param dtype: Categories the names are encoded with
+        :type: CategoricalDtype
+        :return: Category codes
+        :rtype: Numpy ndarray
+        """
+        return pd.Categorical(values, dtype=dtype).codes
+
+    def _compound_codes(self, dtype):
+        """
+        Encodes the compounds of the guidelines with the categories of the
+        queried compounds. The codes are kept for the last vocabulary used.
+
+        :param dtype: Categories of the queried compounds
+        :type: CategoricalDtype
+        :return: Category codes of the guideline compounds
+        :rtype: Numpy ndarray
+        """
+        if self._compounds is None or self._compounds[0] is not dtype:
+            self._compounds = (dtype, self._encode(self.table.matched_cmp_name, dtype))
+        return self._compounds[1]
+
+    def look_up(self, lineage, cmp_name):
+        """
+        Searches for applicable breakpoints for a given lineage and compound,
+        starting at the most specific taxonomic level.
+
+        :param lineage: Taxonomic lineage of the queried organism
+        :type: List
+        :param cmp_name: Compound the organism was tested for
+        :type: String
+        :return: s_value, r_value, matched organism and matched compound
+        :rtype: List
+        """
+        for org in reversed(lineage):
+            entry = self.entries.get((org, cmp_name))
+            if entry is None:
+                continue
+            if entry[4] is not None and entry[4] in lineage:
+                continue
+            return list(entry[:4])
+        return [None]*4
+
+    def resolve(self, pairs, lineages):
+        """
+        Resolves breakpoints for distinct organism-compound pairs at once. The
+        lineages of all pairs are expanded into their taxonomic levels and
+        joined with the guidelines on organism and compound category codes,
+        excepted matches are removed and the most specific level is kept per
+        pair. Categorical compound names are joined on their own codes.
+
+        :param pairs: Distinct combinations of organism_id and cmp_name
+        :type: Pandas DataFrame
+        :param lineages: Lineage names for every TaxID
+        :type: Dictionary
+        :return: Pairs with s_value, r_value, matched organism and compound
+        :rtype: Pandas DataFrame
+        """
+        levels = pd.DataFrame(
+            [(taxid, level, name) for taxid, lineage in lineages.items()
+             for level, name in enumerate(lineage)],
+            columns=['organism_id', 'level', 'matched_organism'])
+        levels['organism_id'] = levels.organism_id.astype(float)
+        levels['organism_code'] = self._encode(levels.matched_organism, self.organisms)
+        levels = levels.loc[levels.organism_code >= 0, ['organism_id', 'level', 'organism_code']]
+
+        if isinstance(pairs.cmp_name.dtype, CategoricalDtype):
+            compounds = pairs.cmp_name.dtype
+        else:
+            compounds = CategoricalDtype(pairs.cmp_name.dropna().unique())
+        keys = pd.DataFrame({'organism_id': pairs.organism_id.values,
+                             'cmp_code': self._encode(pairs.cmp_name, compounds)})
+        guidelines = self.table.assign(cmp_code=self._compound_codes(compounds))
+        guidelines = guidelines[guidelines.cmp_code >= 0]
+
+        matches = keys.merge(levels, on='organism_id').merge(
+            guidelines, on=['organism_code', 'cmp_code'])
+
+        excepted = matches.merge(
+            levels[['organism_id', 'organism_code']].drop_duplicates().rename(
+                columns={'organism_code': 'exception_code'}),
+            on=['organism_id', 'exception_code'], how='left', indicator=True)
+        matches = matches[(excepted._merge == 'left_only').values]
+
+        matches = matches.sort_values('level').drop_duplicates(
+            ['organism_id', 'cmp_code'], keep='last')
+        columns = ['organism_id', 'cmp_code', 's_value', 'r_value',
+                   'matched_organism', 'matched_cmp_name']
+        resolved = keys.merge(matches[columns], on=['organism_id', 'cmp_code'], how='left')
+        resolved['cmp_name'] = pairs.cmp_name.values
+        return resolved[['organism_id', 'cmp_name'] + columns[2:]]
@@ -5,16 +5,22 @@ from pymicruler.utils import util
 
 class ConsoleClassifier:
     @staticmethod
-    def run_console_classification(new_notes):
+    def run_console_classification(new_notes, proposals=None):
         """
         Starts workflow to classify new notes directly via the console.
 
         :param new_notes: All unknown notes
         :type: List
+        :param proposals: Similarity and entry of the most similar known note
+        for unknown notes
+        :type: Dictionary
         """
+        proposals = dict() if proposals is None else proposals
         notes = pd.read_excel(util.Path.IDICT.value, index_col=None)
         for element in new_notes:
             print(element)
+            if element in proposals:
+                ConsoleClassifier._show_proposal(*proposals[element])
             comment_info = {'note_text': element}
             choice = input(util.OutText.REL.value)
 
@@ -31,6 +37,22 @@ class ConsoleClassifier:
             notes = notes.append(comment_info, ignore_index=True, verify_integrity=True)
         notes.to_excel(util.Path.IDICT.value)
 
+    @staticmethod
+    def _show_proposal(similarity, record):
+        """
+        Prints the most similar known note and its classification.
+
+        :param similarity: Similarity of the notes
+        :type: Float
+        :param record: Entry of the known note in the interpretation dictionary
+        :type: Dictionary
+        """
+        classification = ', '.join(
+            '{}: {}'.format(key, value) for key, value in record.items()
+            if key != 'note_text' and not key.startswith('Unnamed') and pd.notna(value))
+        print(util.OutText.PROPOSAL.value.format(
+            similarity, record['note_text'], classification))
+
     @staticmethod
     def _analyse_relevant_notes(comment_info):
         """
@@ -1,16 +1,22 @@
 import pandas as pd
+import os
 import re
 import sys
 
 from pymicruler.utils import util
+from pymicruler.utils import pool
 from pymicruler.bp.BlockProcessor import BlockProcessor as BP
 from pymicruler.bp.BlockInterpreter import BlockInterpreter as BI
 from pymicruler.bp.NoteAnalysis import NoteAnalysis as NA
 from pymicruler.bp.TaxonomyHandler import TaxonomyHandler as TH
 from pymicruler.bp.ResourceCompiler import ResourceCompiler as RC
+from pymicruler.bp.SheetCache import SheetCache, NoteRecorder
 
 
 class EucastParser:
+    # Minimal number of sheets to parse before worker processes are used
+    PARALLEL_MIN_SHEETS = 4
+
     def __init__(self):
         self.ires = pd.read_csv(util.Path.IRES.value)
 
@@ -20,27 +26,37 @@ class EucastParser:
         self.all_sheets = pd.DataFrame()
         self.table = pd.DataFrame()
         self.guidelines = pd.DataFrame()
+        self.sheet_cache_path = util.Path.SHEET_CACHE.value
+        self.sheet_cache = None
 
-    def run_eucast_parser(self, bp_path):
+    def run_eucast_parser(self, bp_path, incremental=False, processes=None):
         """
         Starts the parsing workflow for a given Eucast breakpoint table.
 
         :param bp_path: Path to Eucast breakpoint table.
         :type: String
+        :param incremental: Whether sheets whose content was already parsed
+        are taken from the sheet cache instead of being processed again.
+        :type: Boolean
+        :param processes: Number of worker processes the sheets are parsed
+        in, at most one per CPU. By default all sheets are parsed in the
+        current process.
+        :type: Integer
         :return: Parsed breakpoints
         :rtype: Pandas DataFrame
         """
-        self.all_sheets = pd.DataFrame()
         raw_table = pd.read_excel(
             bp_path, sheet_name=None, na_values=[''], keep_default_na=False)
         relevant_sheets = self._filter_sheets(raw_table)
 
-        for title, sheet in relevant_sheets.items():
-            organism = list(sheet)[0]
-            note_col = self._column_check(sheet)
-            reduced_sheet = self._column_removal(sheet, note_col)
-            breakpoints = self._process_sheet(reduced_sheet, organism)
-            self.all_sheets = pd.concat((self.all_sheets, breakpoints))
+        if incremental:
+            self.sheet_cache = SheetCache(self.sheet_cache_path)
+
+        self.all_sheets = self._parse_all_sheets(
+            list(relevant_sheets.values()), incremental, processes)
+
+        if incremental:
+            self.sheet_cache.save()
 
         self.note_analyser.summarize_note_analysis()
         self.table = self.b_i.run_block_interpreter(
@@ -50,6 +66,73 @@ class EucastParser:
         out_table = self.r_c.run_compilation(self.table, self.ires)
         return out_table
 
+    def _parse_all_sheets(self, sheets, incremental, processes):
+        """
+        Parses all sheets that are not in the sheet cache, either in the
+        current process or in a pool of worker processes. The notes of all
+        sheets are then passed to the note analysis in the order of the
+        sheets and the breakpoints are combined into one table.
+
+        :param sheets: All relevant sheets of the Eucast breakpoint table
+        :type: List
+        :param incremental: Whether the sheet cache is used
+        :type: Boolean
+        :param processes: Number of worker processes
+        :type: Integer
+        :return: Breakpoints of all sheets
+        :rtype: Pandas DataFrame
+        """
+        keys = [SheetCache.fingerprint(x) if incremental else None for x in sheets]
+        results = [None] * len(sheets)
+        pending = []
+        for pos, key in enumerate(keys):
+            entry = self.sheet_cache.get(key) if incremental else None
+            if entry is None:
+                pending.append(pos)
+            else:
+                results[pos] = (entry[0].copy(), entry[1])
+
+        if processes is not None:
+            processes = min(processes, os.cpu_count() or 1, len(pending))
+        if processes is None or processes < 2 or len(pending) < self.PARALLEL_MIN_SHEETS:
+            parsed = [self._parse_sheet(sheets[x]) for x in pending]
+        else:
+            parsed = pool.get_pool(processes).map(
+                self._parse_sheet, [sheets[x] for x in pending], chunksize=1)
+
+        for pos, (breakpoints, notes, exit_code) in zip(pending, parsed):
+            if exit_code is not None:
+                sys.exit(exit_code)
+            results[pos] = (breakpoints, notes)
+            if incremental:
+                self.sheet_cache.put(keys[pos], breakpoints.copy(), notes)
+
+        for breakpoints, notes in results:
+            for note in notes:
+                self.note_analyser.check_if_known(note)
+        return pd.concat([pd.DataFrame()] + [x[0] for x in results])
+
+    @classmethod
+    def _parse_sheet(cls, sheet):
+        """
+        Checks the structure of a sheet and extracts its breakpoints. Notes
+        are only recorded and analysed once all sheets are parsed.
+
+        :param sheet: One sheet of the Eucast breakpoint table
+        :type: Pandas DataFrame
+        :return: Breakpoints, note entries and exit code of failed checks
+        :rtype: Tuple
+        """
+        recorder = NoteRecorder()
+        try:
+            organism = list(sheet)[0]
+            note_col = cls._column_check(sheet)
+            reduced_sheet = cls._column_removal(sheet, note_col)
+            breakpoints = cls._process_sheet(reduced_sheet, organism, recorder)
+        except SystemExit as exit_signal:
+            return None, recorder.entries, exit_signal.code
+        return breakpoints, recorder.entries, None
+
     @staticmethod
     def _filter_sheets(table):
         """
@@ -83,7 +166,8 @@ class EucastParser:
         sheet.columns = util.Cols.BP_OUT.value
         return sheet
 
-    def _process_sheet(self, sheet, organism):
+    @classmethod
+    def _process_sheet(cls, sheet, organism, note_analysis):
         """
         Detects blocks within sheet, initializes analyses and returns
         information.
@@ -92,24 +176,24 @@ class EucastParser:
         :type: Pandas DataFrame
         :param organism: Name of the organism the breakpoints are applicable to
         :type: String
+        :param note_analysis: Instance of the class NoteAnalysis
         :return: Dataframe with ordered breakpoint information
         :rtype: Pandas DataFrame
         """
-        all_breakpoints = pd.DataFrame()
-        block_starters = self._get_blocks(sheet)
+        all_breakpoints = [pd.DataFrame()]
+        block_starters = cls._get_blocks(sheet)
         for idx in range(len(block_starters)-1):
             block = sheet.iloc[block_starters[idx]:block_starters[idx+1]]
             bp = BP()
-            breakpoints = bp.process_block(block, organism, self.note_analyser)
-            all_breakpoints = pd.concat((all_breakpoints, breakpoints))
+            all_breakpoints.append(bp.process_block(block, organism, note_analysis))
 
-        breakpoints = self._analyse_last_block(sheet, block_starters[-1],
-                                               organism)
-        all_breakpoints = pd.concat((all_breakpoints, breakpoints))
+        all_breakpoints.append(cls._analyse_last_block(
+            sheet, block_starters[-1], organism, note_analysis))
 
-        return all_breakpoints
+        return pd.concat(all_breakpoints)
 
-    def _analyse_last_block(self, sheet, block_idx, organism):
+    @staticmethod
+    def _analyse_last_block(sheet, block_idx, organism, note_analysis):
         """
         Finds last breakpoint within block and removes the following free text before
         starting the analysis.
@@ -120,12 +204,13 @@ class EucastParser:
         :type: Integer
         :param organism: Name of the organism the breakpoints are applicable to
         :type: String
+        :param note_analysis: Instance of the class NoteAnalysis
         :return: Dataframe with ordered breakpoint information
         :rtype: Pandas DataFrame
         """
         counter = 0
-        last_idx = sheet.tail(1).index.item()
-        for idx, row in sheet.iloc[block_idx:, 0].iteritems():
+        last_idx = sheet.index[-1]
+        for idx, row in sheet.iloc[block_idx:, 0].items():
             if pd.isna(row):
                 if counter > 2:
                     last_idx = idx
@@ -140,7 +225,7 @@ class EucastParser:
 
         bp = BP()
         block = sheet.iloc[block_idx: last_idx+1]
-        breakpoints = bp.process_block(block, organism, self.note_analyser)
+        breakpoints = bp.process_block(block, organism, note_analysis)
         return breakpoints
 
     @staticmethod
@@ -160,7 +245,8 @@ class EucastParser:
 
         return all_blocks
 
-    def _column_check(self, sheet):
+    @classmethod
+    def _column_check(cls, sheet):
         """
         Checks if column structure matches expectaions.
 
@@ -182,23 +268,23 @@ class EucastParser:
         else:
             for idx in range(sheet.shape[0]):
                 if pd.notna(sheet.iloc[idx, util.ColPosStd.MIC.value]):
-                    if re.match(util.Regex.MIC.value, sheet.iloc[idx, mic]):
+                    if util.compiled(util.Regex.MIC.value).match(sheet.iloc[idx, mic]):
                         idx_1 = idx + 1
                         r_val = sheet.iloc[idx_1, util.ColPosStd.R.value]
                         s_val = sheet.iloc[idx_1, util.ColPosStd.S.value]
                         break
 
-        if re.match(util.Regex.R_VALUE.value, r_val) is None:
+        if util.compiled(util.Regex.R_VALUE.value).match(r_val) is None:
             print(util.OutText.STR_WARN.value.format(
                 title, util.Regex.R_VALUE.value, mic))
             sys.exit(1)
 
-        if re.match(util.Regex.S_VALUE.value, s_val) is None:
+        if util.compiled(util.Regex.S_VALUE.value).match(s_val) is None:
             print(util.OutText.STR_WARN.value.format(
                 title, util.Regex.R_VALUE.value, mic))
             sys.exit(1)
 
-        note_col = self._find_notes(sheet, idx, title)
+        note_col = cls._find_notes(sheet, idx, title)
         return note_col
 
     @staticmethod
@@ -224,7 +310,7 @@ class EucastParser:
         for idx, entry in sheet.iloc[row_idx].items():
             if pd.isna(entry):
                 continue
-            elif re.match(util.Regex.NOTES.value, entry):
+            elif util.compiled(util.Regex.NOTES.value).match(entry):
                 col_idx = sheet.columns.get_loc(idx)
                 break
 
@@ -1,19 +1,35 @@
-import re
+import os
 import codecs
+import numpy as np
 import pandas as pd
 
 from pymicruler.utils import util
 from pymicruler.bp.ConsoleClassifier import ConsoleClassifier
+from pymicruler.bp.NoteMatcher import NoteMatcher
 
 
 class NoteAnalysis:
-    def __init__(self):
-        self.notes = pd.read_excel(util.Path.IDICT.value)
+    def __init__(self, auto_apply=None):
+        """
+        :param auto_apply: Minimal similarity for an unknown note to be
+        classified like a known note, e.g. util.NoteMatch.AUTO. By default
+        similar known notes are only proposed for the manual classification.
+        :type: Float/None
+        """
+        self.note_columns = []
+        self.note_index = dict()
+        self.normalized_index = dict()
+        self.note_matcher = NoteMatcher(auto_apply)
+        self.added_notes = []
+        self.notes_version = None
+        self._refresh_notes()
         self.list_of_patterns = util.NoteRegex.all_patterns.value
 
         self._read_old_ocurrences()
 
         self.unknown_note_list = []
+        self.matched_notes = []
+        self.proposals = dict()
         self.int_rules_new = dict()
 
     def _read_old_ocurrences(self):
@@ -24,6 +40,69 @@ class NoteAnalysis:
         with open(util.Path.OLD_OCC.value, 'r', encoding='UTF-8') as f_handle:
             self.int_rules_old = eval(f_handle.read())
 
+    def _refresh_notes(self):
+        """
+        Reads the interpretation dictionary into the note index if the file
+        was changed since it was last read.
+        """
+        stat = os.stat(util.Path.IDICT.value)
+        version = (stat.st_mtime_ns, stat.st_size)
+        if version == self.notes_version:
+            return
+
+        notes = pd.read_excel(util.Path.IDICT.value)
+        self.note_columns = list(notes)
+        self.note_index = dict()
+        self.normalized_index = dict()
+        self.note_matcher = NoteMatcher(self.note_matcher.auto_apply,
+                                        self.note_matcher.propose)
+        for record in notes.to_dict('records') + self.added_notes:
+            self._add_note(record)
+        self.notes_version = version
+
+    def _add_note(self, record):
+        """
+        Adds a note to the index, the first entry of a note text is kept.
+
+        :param record: All columns of the interpretation dictionary for a note
+        :type: Dictionary
+        """
+        if record['note_text'] not in self.note_index:
+            self.note_matcher.add(record)
+        self.note_index.setdefault(record['note_text'], record)
+        self.normalized_index.setdefault(
+            self._normalize(record['note_text']), record)
+
+    @staticmethod
+    def _normalize(text):
+        """
+        Normalizes note text so that notes only differing in whitespace match.
+
+        :param text: Note text
+        :type: String
+        :return: Note text with single spaces between words
+        :rtype: String
+        """
+        if not isinstance(text, str):
+            return text
+        return ' '.join(text.split())
+
+    def _find_note(self, text):
+        """
+        Returns the entry of the interpretation dictionary for a note text.
+        Notes are matched on their exact text first and on their normalized
+        text otherwise.
+
+        :param text: Note text
+        :type: String
+        :return: Entry of the note or None
+        :rtype: Dictionary/None
+        """
+        record = self.note_index.get(text)
+        if record is None:
+            record = self.normalized_index.get(self._normalize(text))
+        return record
+
     def check_if_known(self, entry):
         """
         Analyses if note text was already described in a previous version.
@@ -31,9 +110,37 @@ class NoteAnalysis:
         :param entry: Note text to be analysed.
         :type: String
         """
-        if entry not in self.notes.note_text.values:
+        if self._find_note(entry) is None and not self._match_similar_note(entry):
             self._check_for_pattern(entry)
 
+    def _match_similar_note(self, entry):
+        """
+        Classifies an unknown note like the most similar known note if they
+        are nearly identical and automatic classification is switched on,
+        otherwise the known note is kept as proposal for the manual
+        classification.
+
+        :param entry: Unknown note text
+        :type: String
+        :return: Whether the note was classified
+        :rtype: Boolean
+        """
+        match = self.note_matcher.match(entry)
+        if match is None:
+            return False
+
+        decision, similarity, record = match
+        if decision == 'propose':
+            self.proposals[entry] = (similarity, record)
+            return False
+
+        new_record = dict(record)
+        new_record['note_text'] = entry
+        self.added_notes.append(new_record)
+        self._add_note(new_record)
+        self.matched_notes.append((entry, record['note_text'], similarity))
+        return True
+
     def _check_for_pattern(self, entry):
         """
         Analyses if unknown note contains any pattern that mark it as irrelevant.
@@ -42,23 +149,32 @@ class NoteAnalysis:
         :type: String
         """
         for pattern in self.list_of_patterns:
-            if re.search(pattern, entry) is not None:
-                self.notes.loc[self.notes.index.max() + 1,
-                               ['note_text', 'relevance']] = (entry, 0)
+            if util.compiled(pattern).search(entry) is not None:
+                record = dict.fromkeys(self.note_columns, np.NaN)
+                record.update({'note_text': entry, 'relevance': 0})
+                self.added_notes.append(record)
+                self._add_note(record)
             elif entry not in self.unknown_note_list:
                 self.unknown_note_list.append(entry)
 
     def summarize_note_analysis(self):
         """
-        Asks user how to classify unknown comments.
+        Reports comments that were classified like similar known comments and
+        asks user how to classify unknown comments.
         """
+        if len(self.matched_notes) > 0:
+            print(util.OutText.MATCHED.value.format(len(self.matched_notes)))
+            for entry, known, similarity in self.matched_notes:
+                print(util.OutText.MATCHED_NOTE.value.format(entry, known, similarity))
+
         if len(self.unknown_note_list) == 0:
             return
 
         choice = input(util.OutText.CHOICE.value.format(
             len(self.unknown_note_list)))
         if choice == 'a':
-            ConsoleClassifier.run_console_classification(self.unknown_note_list)
+            ConsoleClassifier.run_console_classification(
+                self.unknown_note_list, self.proposals)
         elif choice == 'b':
             self._save_missing_notes()
         else:
@@ -67,9 +183,14 @@ class NoteAnalysis:
 
     def _save_missing_notes(self):
         """
-        Writes out any missing notes for manual classification.
+        Writes out any missing notes for manual classification together with
+        the most similar known note.
         """
-        pd.DataFrame(self.unknown_note_list, columns=['note_text']) \
+        proposals = [self.proposals.get(x, (np.NaN, {'note_text': np.NaN}))
+                     for x in self.unknown_note_list]
+        pd.DataFrame({'note_text': self.unknown_note_list,
+                      'similar_note': [x[1]['note_text'] for x in proposals],
+                      'similarity': [x[0] for x in proposals]}) \
             .to_excel(util.Path.MISSING_NOTES.value, index=False)
 
     def get_note_information(self, text, organism, cmp_name):
@@ -84,9 +205,8 @@ class NoteAnalysis:
         :return: Information about content of note
         :rtype: Dictionary
         """
-        self.notes = pd.read_excel(util.Path.IDICT.value)
-        entry = self.notes[self.notes.note_text == text].iloc[0]
-        info_dict = entry.to_dict()
+        self._refresh_notes()
+        info_dict = dict(self._find_note(text))
 
         if info_dict['interpretation'] == 1:
             self._interpretive_rule_logger(text, organism, cmp_name)
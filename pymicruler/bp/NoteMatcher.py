@@ -0,0 +1,157 @@
+from collections import Counter
+
+from pymicruler.utils import util
+
+
+class NoteMatcher:
+    def __init__(self, auto_apply=None, propose=util.NoteMatch.PROPOSE.value):
+        """
+        Inverted index of word shingles over the known notes. New notes are
+        compared only with the known notes they share a shingle with.
+
+        :param auto_apply: Minimal similarity for a note to take over the
+        classification of the most similar known note, e.g.
+        util.NoteMatch.AUTO. By default known notes are only proposed.
+        :type: Float/None
+        :param propose: Minimal similarity for the most similar known note to
+        be proposed for the manual classification
+        :type: Float
+        """
+        self.auto_apply = auto_apply
+        self.propose = propose
+        self.records = []
+        self.shingles = []
+        self.postings = dict()
+
+    def __len__(self):
+        return len(self.records)
+
+    @staticmethod
+    def _shingle(text):
+        """
+        Splits note text into overlapping sequences of lower case words.
+
+        :param text: Note text
+        :type: String
+        :return: Word shingles of the text
+        :rtype: Set
+        """
+        words = util.compiled(util.NoteMatch.WORD.value).findall(text.lower())
+        size = util.NoteMatch.SHINGLE.value
+        if len(words) < size:
+            return {tuple(words)} if len(words) > 0 else set()
+        return {tuple(words[x:x+size]) for x in range(len(words) - size + 1)}
+
+    @staticmethod
+    def _numbers(text):
+        """
+        Returns all numbers of a note text, e.g. concentrations or note numbers.
+
+        :param text: Note text
+        :type: String
+        :return: Numbers of the text
+        :rtype: Set
+        """
+        return set(util.compiled(util.NoteMatch.NUMBER.value).findall(text))
+
+    @staticmethod
+    def _negations(text):
+        """
+        Counts the negations of a note text, e.g. 'not' or 'except'.
+
+        :param text: Note text
+        :type: String
+        :return: Number of occurrences of every negation
+        :rtype: Counter
+        """
+        return Counter(util.compiled(util.NoteMatch.NEGATION.value).findall(text.lower()))
+
+    @staticmethod
+    def _organisms(text):
+        """
+        Returns all organism names of a note text, e.g. genus names or
+        organism groups.
+
+        :param text: Note text
+        :type: String
+        :return: Organism tokens of the text
+        :rtype: Set
+        """
+        return set(util.compiled(util.NoteMatch.ORGANISM.value).findall(text))
+
+    def _same_content(self, text, known):
+        """
+        Checks that two notes contain the same numbers, negations and
+        organisms, as notes differing only in these words can still be
+        classified differently.
+
+        :param text: Note text
+        :type: String
+        :param known: Text of the known note
+        :type: String
+        :return: Whether the notes can be classified alike
+        :rtype: Boolean
+        """
+        return self._numbers(text) == self._numbers(known) \
+            and self._negations(text) == self._negations(known) \
+            and self._organisms(text) == self._organisms(known)
+
+    def add(self, record):
+        """
+        Adds a known note to the index.
+
+        :param record: All columns of the interpretation dictionary for a note
+        :type: Dictionary
+        """
+        if not isinstance(record['note_text'], str):
+            return
+        note_id = len(self.records)
+        shingles = self._shingle(record['note_text'])
+        self.records.append(record)
+        self.shingles.append(len(shingles))
+        for shingle in shingles:
+            self.postings.setdefault(shingle, []).append(note_id)
+
+    def nearest(self, text):
+        """
+        Finds the most similar known note by the Jaccard similarity of their
+        word shingles, ties are resolved in favour of the earlier entry.
+
+        :param text: Note text
+        :type: String
+        :return: Similarity and entry of the most similar note or None
+        :rtype: Tuple/None
+        """
+        shingles = self._shingle(text)
+        shared = Counter()
+        for shingle in shingles:
+            shared.update(self.postings.get(shingle, []))
+        if len(shared) == 0:
+            return None
+
+        note_id, similarity = min(
+            ((x, count / (len(shingles) + self.shingles[x] - count))
+             for x, count in shared.items()), key=lambda x: (-x[1], x[0]))
+        return similarity, self.records[note_id]
+
+    def match(self, text):
+        """
+        Decides how a new note can be classified based on the most similar
+        known note. Classifications are only taken over if automatic
+        classification is switched on and both notes contain the same
+        numbers, negations and organisms.
+
+        :param text: Note text
+        :type: String
+        :return: 'apply' or 'propose', the similarity and the known entry or
+        None if no known note is similar enough
+        :rtype: Tuple/None
+        """
+        nearest = self.nearest(text)
+        if nearest is None or nearest[0] < self.propose:
+            return None
+        similarity, record = nearest
+        if self.auto_apply is not None and similarity >= self.auto_apply \
+                and self._same_content(text, record['note_text']):
+            return 'apply', similarity, record
+        return 'propose', similarity, record
@@ -0,0 +1,97 @@
+import os
+import pickle
+
+from pymicruler.bp.BreakpointIndex import BreakpointIndex
+from pymicruler.utils import util
+from pymicruler.utils.cache import LruCache
+
+
+class ResourceCache:
+    # Version of the on-disk format, increase if the stored objects change
+    FORMAT = 3
+    memory = LruCache(maxsize=8)
+
+    @staticmethod
+    def load(path):
+        """
+        Returns the parsed guidelines and their breakpoint index. The workbook
+        is only read if neither the in-process cache nor the binary copy next
+        to it match its current state.
+
+        :param path: Path to parsed Eucast guidelines table.
+        :type: String
+        :return: Guidelines table and compiled breakpoint index
+        :rtype: Pandas DataFrame, BreakpointIndex
+        """
+        key = ResourceCache._fingerprint(path)
+        entry = ResourceCache.memory.get(key)
+        if entry is None:
+            entry = ResourceCache._read_binary_copy(key)
+        if entry is None:
+            resource = util.read_table(path)
+            entry = (resource, BreakpointIndex(resource))
+            ResourceCache._write_binary_copy(key, entry)
+        ResourceCache.memory.put(key, entry)
+        return entry
+
+    @staticmethod
+    def _fingerprint(path):
+        """
+        Identifies the current state of a file by path, modification time and
+        size.
+
+        :param path: Path to the file
+        :type: String
+        :return: Absolute path, mtime in ns and size in bytes
+        :rtype: Tuple
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        return path, stat.st_mtime_ns, stat.st_size
+
+    @staticmethod
+    def _read_binary_copy(key):
+        """
+        Reads the binary copy of a resource if it was written for the same
+        state of the workbook.
+
+        :param key: Fingerprint of the workbook
+        :type: Tuple
+        :return: Guidelines table and breakpoint index or None
+        :rtype: Tuple/None
+        """
+        copy_path = key[0] + util.CacheFiles.RESOURCE.value
+        if not os.path.exists(copy_path):
+            return None
+        try:
+            with open(copy_path, 'rb') as f_handle:
+                stored = pickle.load(f_handle)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return None
+        if stored.get('format') != ResourceCache.FORMAT or stored.get('key') != key:
+            return None
+        return stored['resource'], stored['index']
+
+    @staticmethod
+    def _write_binary_copy(key, entry):
+        """
+        Stores a binary copy of the guidelines and breakpoint index next to
+        the workbook. The file is replaced atomically, read-only locations
+        are skipped.
+
+        :param key: Fingerprint of the workbook
+        :type: Tuple
+        :param entry: Guidelines table and breakpoint index
+        :type: Tuple
+        """
+        copy_path = key[0] + util.CacheFiles.RESOURCE.value
+        stored = {'format': ResourceCache.FORMAT, 'key': key,
+                  'resource': entry[0], 'index': entry[1]}
+        tmp_path = '{}.{}.tmp'.format(copy_path, os.getpid())
+        try:
+            with open(tmp_path, 'wb') as f_handle:
+                pickle.dump(stored, f_handle, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, copy_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -1,7 +1,21 @@
 from pyknow import *
 from pymicruler.utils import util
 from pymicruler.bp.TaxonomyHandler import TaxonomyHandler as TH
+from pymicruler.utils.cache import LruCache
+from pymicruler.utils import pool
+from functools import wraps
 import pandas as pd
+import time
+
+
+# Engine results of already analysed phenotypes, keyed on their signature
+outcome_cache = LruCache(maxsize=10000)
+memo_info = {'samples': 0, 'engine_runs': 0}
+# Organism fact names of already analysed species
+organism_cache = LruCache(maxsize=10000)
+
+# Engine of the current worker process
+worker_engine = None
 
 
 class Init(Fact):
@@ -40,11 +54,129 @@ class InducibleMlsbResistance(Fact):
     pass
 
 
+class RuleStats:
+    def __init__(self):
+        """
+        Collects how often each rule fires, how many facts it declares and
+        retracts and how much time is spent in it. The time for matching
+        facts against the rules is not part of any rule. Samples resolved
+        from the outcome cache do not run the engine, they are only counted
+        as memo hits in the summary.
+        """
+        self.rules = dict()
+        self.current = None
+        self.samples = 0
+        self.engine_runs = 0
+
+    def _entry(self, name):
+        entry = self.rules.get(name)
+        if entry is None:
+            entry = {'activations': 0, 'declared': 0, 'retracted': 0, 'seconds': 0.0}
+            self.rules[name] = entry
+        return entry
+
+    def measure(self, name, function, args, kwargs):
+        """
+        Executes the right-hand side of a rule and records its statistics.
+
+        :param name: Name of the rule
+        :type: String
+        :param function: Right-hand side of the rule
+        :type: Callable
+        :return: Return value of the rule
+        """
+        entry = self._entry(name)
+        previous = self.current
+        self.current = name
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            entry['seconds'] += time.perf_counter() - start
+            entry['activations'] += 1
+            self.current = previous
+
+    def count(self, kind, n_facts):
+        """
+        Adds declared or retracted facts to the rule that is currently fired.
+
+        :param kind: 'declared' or 'retracted'
+        :type: String
+        :param n_facts: Number of facts
+        :type: Integer
+        """
+        if self.current is not None:
+            self._entry(self.current)[kind] += n_facts
+
+    def count_samples(self, samples, engine_runs):
+        """
+        Adds analysed samples and the number of them that ran the engine.
+
+        :param samples: Number of analysed samples
+        :type: Integer
+        :param engine_runs: Number of samples evaluated by the engine
+        :type: Integer
+        """
+        self.samples += samples
+        self.engine_runs += engine_runs
+
+    def merge(self, other):
+        """
+        Adds the statistics collected by another instance, e.g. during a
+        call in another thread.
+
+        :param other: Collected statistics
+        :type: RuleStats
+        """
+        for name, entry in other.rules.items():
+            totals = self._entry(name)
+            for key, value in entry.items():
+                totals[key] += value
+        self.count_samples(other.samples, other.engine_runs)
+
+    def reset(self):
+        """
+        Removes all collected statistics.
+        """
+        self.rules = dict()
+        self.current = None
+        self.samples = 0
+        self.engine_runs = 0
+
+    def summary(self):
+        """
+        Reports how many samples the rule statistics are based on. Rule
+        activations and facts only cover the engine runs, not the memo hits.
+
+        :return: Number of samples, engine runs and memo hits
+        :rtype: Dictionary
+        """
+        return {'samples': self.samples,
+                'engine_runs': self.engine_runs,
+                'memo_hits': self.samples - self.engine_runs}
+
+    def table(self):
+        """
+        Returns the statistics of all fired rules, the most expensive first.
+
+        :return: Activations, declared and retracted facts and seconds per rule
+        :rtype: Pandas DataFrame
+        """
+        table = pd.DataFrame.from_dict(
+            self.rules, orient='index',
+            columns=['activations', 'declared', 'retracted', 'seconds'])
+        table.index.name = 'rule'
+        return table.sort_values('seconds', ascending=False)
+
+
 class BacterialResistance(KnowledgeEngine):
     def __init__(self):
         self.out_res = {}
-        self.compound_classes = util.read_in_reference_dict('cmp_classes')
+        self.rule_stats = None
+        self.compound_classes = {key: tuple(members) for key, members in
+                                 util.read_in_reference_dict('cmp_classes').items()}
         self.phen_dict = util.read_in_reference_dict('phen_groups')
+        self.deffacts = None
         self.beta_lactam_agents = util.Info.BLA.value
         self.cmp_for_mrsa = ()
         self.isoxazolyl_penicillins = util.Info.ISOXAZYL.value
@@ -108,32 +240,97 @@ class BacterialResistance(KnowledgeEngine):
             for cmp in cmp_list:
                 self.declare(Intermediate(cmp_name=cmp))
 
+    def declare(self, *facts):
+        """
+        Declares facts and counts them for the currently fired rule if rule
+        statistics are collected.
+        """
+        if self.rule_stats is not None:
+            self.rule_stats.count('declared', len(facts))
+        return super().declare(*facts)
+
+    def retract(self, idx_or_declared_fact):
+        """
+        Retracts a fact and counts it for the currently fired rule if rule
+        statistics are collected.
+        """
+        if self.rule_stats is not None:
+            self.rule_stats.count('retracted', 1)
+        return super().retract(idx_or_declared_fact)
+
+    def get_deffacts(self):
+        """
+        Returns the deffacts of the engine, which are only collected once instead of on
+        every reset.
+
+        :return: All deffacts sorted by their order
+        :rtype: List
+        """
+        if self.deffacts is None:
+            self.deffacts = super().get_deffacts()
+        return self.deffacts
+
     def check_if_group_member(self, organism):
         """
         Checks whether the organism that is analysed is member of any phenotypically defined group.
 
         :param organism: name of the species that is analysed.
         :type: String
+        :return: Names of all groups the organism is member of
+        :rtype: List
         """
-        for key, item in self.phen_dict.items():
-            if organism in item:
-                self.declare(Organism(name=key))
+        return [key for key, item in self.phen_dict.items() if organism in item]
 
-    def process_organism(self, organism):
+    def collect_organism_names(self, organism):
         """
-        Takes the species that should be analysed and declares all taxonomic parents and
-        checks whether eny of them is member of a phenotypically defined group.
+        Collects the names of all taxonomic parents of a species, each followed by the
+        phenotypically defined groups it is member of.
 
         :param organism: name of the species
         :type: String
+        :return: Names to be declared as Organism facts
+        :rtype: Tuple
         """
         all_lineages = list()
         all_lineages.append(organism)
         taxid = TH.translate_all(all_lineages)
         lineage = TH.get_all_lineages(taxid[organism])[0]
+        names = []
         for entry in lineage:
-            self.declare(Organism(name=entry))
-            self.check_if_group_member(entry)
+            names.append(entry)
+            names.extend(self.check_if_group_member(entry))
+        return tuple(names)
+
+    def process_organism(self, organism):
+        """
+        Takes the species that should be analysed and declares all taxonomic parents and
+        any phenotypically defined group they are member of. The names are kept in the
+        organism cache next to the outcome cache.
+
+        :param organism: name of the species
+        :type: String
+        """
+        names = organism_cache.get(organism)
+        if names is None:
+            names = self.collect_organism_names(organism)
+            organism_cache.put(organism, names)
+        for name in names:
+            self.declare(Organism(name=name))
+
+    def run_sample(self, res_dict):
+        """
+        Resets the engine, declares the resistance information of a sample and runs all
+        rules on it.
+
+        :param res_dict: Resistance information as created by prepare_data
+        :type: Dictionary
+        :return: New resistance information for the sample
+        :rtype: Dictionary
+        """
+        self.reset()
+        self.declare(Init(res_dict=res_dict))
+        self.run()
+        return self.out_res
 
     def _write_out_all_phenotypes(self, cmp, res_dict, label):
         """
@@ -692,26 +889,176 @@ class BacterialResistance(KnowledgeEngine):
         self._write_out_all_phenotypes(cmp, res_dict, 'I')
 
 
-def run_rbe(groups):
+def _measured(function):
     """
-    Prepares data and starts rule based engine.
+    Wraps the right-hand side of a rule so its statistics are recorded while
+    the engine collects rule statistics.
+
+    :param function: Right-hand side of the rule
+    :type: Callable
+    :return: Wrapped function
+    :rtype: Callable
+    """
+    @wraps(function)
+    def wrapper(engine, *args, **kwargs):
+        if engine.rule_stats is None:
+            return function(engine, *args, **kwargs)
+        return engine.rule_stats.measure(
+            function.__name__, function, (engine,) + args, kwargs)
+    return wrapper
+
+
+for _rule in vars(BacterialResistance).values():
+    if isinstance(_rule, Rule) and _rule._wrapped is not None:
+        _rule._wrapped = _measured(_rule._wrapped)
+
+
+def run_rbe(groups, engine=None, memo=True, processes=None, chunk_size=16, rule_stats=None):
+    """
+    Prepares data and starts rule based engine. Samples whose phenotype
+    signature was already analysed are resolved from the outcome cache.
 
     :param groups: AST results grouped by sample_id
     :type: Pandas Groupby
+    :param engine: Already initialised engine that should be reused. A new
+    one is created by default.
+    :type: BacterialResistance
+    :param memo: Whether known phenotypes are resolved without the engine.
+    :type: Boolean
+    :param processes: Number of worker processes. By default all samples are
+    analysed in the current process.
+    :type: Integer
+    :param chunk_size: Number of samples sent to a worker process at once.
+    :type: Integer
+    :param rule_stats: Collects activations, facts and time per rule. All
+    samples are then evaluated in the current process. Samples resolved from
+    the outcome cache are only counted as memo hits.
+    :type: RuleStats
     :return: New resistance information deducted from the rule based engine
     :rtype: Dictionary
     """
-    bpe = BacterialResistance()
-    results = []
+    if rule_stats is not None:
+        engine = engine if engine is not None else BacterialResistance()
+        engine.rule_stats = rule_stats
+        engine_runs = memo_info['engine_runs']
+        try:
+            results = run_rbe(groups, engine, memo)
+        finally:
+            engine.rule_stats = None
+        engine_runs = memo_info['engine_runs'] - engine_runs if memo else len(results)
+        rule_stats.count_samples(len(results), engine_runs)
+        return results
+
     all_dicts = prepare_data(groups)
+    if not memo:
+        return evaluate(all_dicts, engine, processes, chunk_size)
+
+    pending = dict()
+    for pos, res_dict in enumerate(all_dicts):
+        pending.setdefault(get_signature(res_dict), []).append(pos)
+
+    results = [None] * len(all_dicts)
+    missing = []
+    for signature, positions in pending.items():
+        out_res = outcome_cache.get(signature)
+        if out_res is None:
+            missing.append(signature)
+        else:
+            for pos in positions:
+                results[pos] = dict(out_res)
+
+    outcomes = evaluate([all_dicts[pending[x][0]] for x in missing],
+                        engine, processes, chunk_size)
+    for signature, out_res in zip(missing, outcomes):
+        outcome_cache.put(signature, dict(out_res))
+        for pos in pending[signature]:
+            results[pos] = dict(out_res)
+
+    memo_info['samples'] += len(all_dicts)
+    memo_info['engine_runs'] += len(missing)
+    return results
 
-    for group_ab in all_dicts:
-        bpe.reset()
-        bpe.declare(Init(res_dict=group_ab))
-        bpe.run()
-        results.append(bpe.out_res)
 
-    return results
+def evaluate(all_dicts, engine=None, processes=None, chunk_size=16):
+    """
+    Runs the engine for all samples, either in the current process or sharded across a
+    pool of worker processes. Results are returned in the order of the samples.
+
+    :param all_dicts: Resistance information of all samples as created by prepare_data
+    :type: List of Dictionaries
+    :param engine: Already initialised engine that should be reused in the current process.
+    :type: BacterialResistance
+    :param processes: Number of worker processes.
+    :type: Integer
+    :param chunk_size: Number of samples sent to a worker process at once.
+    :type: Integer
+    :return: New resistance information for each of the samples
+    :rtype: List of Dictionaries
+    """
+    if processes is None or processes < 2 or len(all_dicts) <= chunk_size:
+        bpe = engine if engine is not None else BacterialResistance()
+        return [bpe.run_sample(x) for x in all_dicts]
+    return pool.get_pool(processes, _init_worker).map(
+        _evaluate_sample, all_dicts, chunksize=chunk_size)
+
+
+def _init_worker():
+    """
+    Creates the engine of a worker process. The taxonomy connection inherited from the
+    parent process is dropped, the worker opens its own one if needed.
+    """
+    global worker_engine
+    TH.reset_connection()
+    worker_engine = BacterialResistance()
+
+
+def _evaluate_sample(res_dict):
+    """
+    Analyses a single sample with the engine of the worker process.
+
+    :param res_dict: Resistance information of the sample
+    :type: Dictionary
+    :return: New resistance information for the sample
+    :rtype: Dictionary
+    """
+    return worker_engine.run_sample(res_dict)
+
+
+def get_signature(res_dict):
+    """
+    Creates a hashable signature of the resistance information of a sample.
+    The compound order is kept, as it determines the order in which facts
+    are declared.
+
+    :param res_dict: Resistance information as created by prepare_data
+    :type: Dictionary
+    :return: Organism and compound, label and MIC of all tested compounds
+    :rtype: Tuple
+    """
+    entries = []
+    for key, item in res_dict.items():
+        if key == 'organism':
+            continue
+        mic = None if pd.isna(item['mic']) else float(item['mic'])
+        entries.append((key, item['label'], mic))
+    return res_dict['organism'], tuple(entries)
+
+
+def get_memo_info():
+    """
+    Reports how many samples were resolved without running the engine.
+
+    :return: Number of samples, engine runs, hit ratio and usage of the
+    outcome and organism caches
+    :rtype: Dictionary
+    """
+    samples = memo_info['samples']
+    hits = samples - memo_info['engine_runs']
+    return {'samples': samples,
+            'engine_runs': memo_info['engine_runs'],
+            'hit_ratio': hits / samples if samples > 0 else 0.0,
+            'cache': outcome_cache.info(),
+            'organisms': organism_cache.info()}
 
 
 def prepare_data(groups):
@@ -726,10 +1073,11 @@ def prepare_data(groups):
     all_dicts = []
     for idx, group in groups:
         res_dict = {'organism': group.organism.iloc[0]}
-        for g_idx, row in group.iterrows():
-            if pd.notna(row.label):
-                res_dict[row.cmp_name] = {'label': row.label, 'mic': row.MIC}
+        for cmp_name, label, mic in zip(group.cmp_name.values, group.label.values,
+                                        group.MIC.values):
+            if pd.notna(label):
+                res_dict[cmp_name] = {'label': label, 'mic': mic}
             else:
-                res_dict[row.cmp_name] = {'label': '', 'mic': row.MIC}
+                res_dict[cmp_name] = {'label': '', 'mic': mic}
         all_dicts.append(res_dict)
     return all_dicts
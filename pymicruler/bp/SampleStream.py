@@ -0,0 +1,92 @@
+import pandas as pd
+
+from pymicruler.utils import util
+
+
+class SampleStream:
+
+    @staticmethod
+    def read_samples(source, rows_per_chunk=100000):
+        """
+        Splits AST results into chunks that contain all rows of their samples.
+        The rows of the last sample of every chunk are held back and prepended
+        to the next chunk, the input therefore has to be sorted by sample_id.
+        Only the held back rows are kept between chunks.
+
+        :param source: Path to a CSV/Parquet file or iterable of data frames
+        :type: String/Iterable
+        :param rows_per_chunk: Number of rows read at once from files
+        :type: Integer
+        :return: Chunks of complete samples
+        :rtype: Generator
+        """
+        carry = None
+
+        for chunk in SampleStream.read_chunks(source, rows_per_chunk):
+            if 'sample_id' not in list(chunk):
+                if len(chunk) > 0:
+                    yield chunk.reset_index(drop=True)
+                continue
+
+            if carry is not None:
+                chunk = pd.concat((carry, chunk), ignore_index=True, sort=False)
+                carry = None
+            if len(chunk) == 0:
+                continue
+            SampleStream._check_order(chunk.sample_id)
+
+            last_id = chunk.sample_id.iloc[-1]
+            tail = (chunk.sample_id == last_id).values
+            complete = chunk[~tail]
+            carry = chunk[tail]
+            if len(complete) > 0:
+                yield complete.reset_index(drop=True)
+
+        if carry is not None and len(carry) > 0:
+            yield carry.reset_index(drop=True)
+
+    @staticmethod
+    def read_chunks(source, rows_per_chunk=100000):
+        """
+        Reads a CSV or Parquet file in chunks, Feather and Excel files are read
+        at once and then split. Iterables of data frames are passed through.
+
+        :param source: Path to a table or iterable of data frames
+        :type: String/Iterable
+        :param rows_per_chunk: Number of rows read at once from files
+        :type: Integer
+        :return: Chunks of the input
+        :rtype: Generator
+        """
+        if isinstance(source, pd.DataFrame):
+            source = [source]
+
+        if not isinstance(source, str):
+            for chunk in source:
+                yield chunk
+        elif source.endswith(util.Columnar.PARQUET.value):
+            util.require_arrow(source)
+            import pyarrow.parquet as pq
+            for batch in pq.ParquetFile(source).iter_batches(batch_size=rows_per_chunk):
+                yield batch.to_pandas()
+        elif source.endswith('.csv'):
+            for chunk in pd.read_csv(source, chunksize=rows_per_chunk):
+                yield chunk
+        else:
+            table = util.read_table(source)
+            for start in range(0, len(table), rows_per_chunk):
+                yield table[start:start + rows_per_chunk]
+
+    @staticmethod
+    def _check_order(sample_ids):
+        """
+        Makes sure that the sample IDs of a chunk are sorted. As every chunk
+        starts with the rows held back from the previous one, no sample can
+        be continued after it was completed.
+
+        :param sample_ids: Sample IDs of a chunk including the held back rows
+        :type: Pandas Series
+        """
+        if not sample_ids.is_monotonic_increasing:
+            raise ValueError('Rows of a sample must be stored consecutively, '
+                             'sort the input by sample_id.')
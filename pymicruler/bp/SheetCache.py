@@ -0,0 +1,143 @@
+import os
+import pickle
+import hashlib
+import importlib.util
+from collections import OrderedDict
+
+
+class NoteRecorder:
+    def __init__(self):
+        """
+        Takes the place of the note analysis while a sheet is processed and
+        keeps all notes, so they can be analysed after the sheet was parsed
+        in another process or taken from the cache.
+        """
+        self.entries = []
+
+    def check_if_known(self, entry):
+        self.entries.append(entry)
+
+
+class SheetCache:
+    # Version of the cache file, increase if the structure of the stored results changes
+    FORMAT = 1
+    # Modules whose source code determines the processed sheets
+    MODULES = ['pymicruler.bp.EucastParser', 'pymicruler.bp.BlockProcessor',
+               'pymicruler.bp.SheetCache', 'pymicruler.utils.util']
+    _code_version = None
+
+    def __init__(self, path, maxsize=500):
+        """
+        Stores processed sheets of Eucast breakpoint tables keyed on the
+        fingerprint of their raw content.
+
+        :param path: Path to the cache file
+        :type: String
+        :param maxsize: Maximal number of stored sheets
+        :type: Integer
+        """
+        self.path = path
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.sheets = self._read()
+
+    @staticmethod
+    def code_version():
+        """
+        Identifies the sheet processing by the source code of the parsing
+        modules, so results of an earlier version are not served after the
+        code was changed.
+
+        :return: Hex digest of the parsing modules
+        :rtype: String
+        """
+        if SheetCache._code_version is None:
+            digest = hashlib.sha256()
+            for name in SheetCache.MODULES:
+                with open(importlib.util.find_spec(name).origin, 'rb') as f_handle:
+                    digest.update(f_handle.read())
+            SheetCache._code_version = digest.hexdigest()
+        return SheetCache._code_version
+
+    @staticmethod
+    def fingerprint(sheet):
+        """
+        Identifies a raw sheet by its title and content and the version of
+        the parsing code.
+
+        :param sheet: Sheet of the Eucast breakpoint table
+        :type: Pandas DataFrame
+        :return: Hex digest of the sheet
+        :rtype: String
+        """
+        content = '{}\n{}\n{}'.format(
+            SheetCache.FORMAT, SheetCache.code_version(), sheet.to_csv())
+        return hashlib.sha256(content.encode('UTF-8')).hexdigest()
+
+    def get(self, key):
+        """
+        Returns the processed breakpoints and notes of a sheet.
+
+        :param key: Fingerprint of the sheet
+        :type: String
+        :return: Breakpoints and note entries or None
+        :rtype: Tuple/None
+        """
+        entry = self.sheets.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.sheets.move_to_end(key)
+        return entry
+
+    def put(self, key, breakpoints, notes):
+        """
+        Stores the processed breakpoints and notes of a sheet.
+
+        :param key: Fingerprint of the sheet
+        :type: String
+        :param breakpoints: Breakpoints of the sheet
+        :type: Pandas DataFrame
+        :param notes: Note entries checked while processing the sheet
+        :type: List
+        """
+        self.sheets[key] = (breakpoints, notes)
+        self.sheets.move_to_end(key)
+        while len(self.sheets) > self.maxsize:
+            self.sheets.popitem(last=False)
+
+    def _read(self):
+        """
+        Reads the cache file, unreadable or outdated files are ignored.
+
+        :return: Processed sheets
+        :rtype: OrderedDict
+        """
+        if not os.path.exists(self.path):
+            return OrderedDict()
+        try:
+            with open(self.path, 'rb') as f_handle:
+                stored = pickle.load(f_handle)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return OrderedDict()
+        if stored.get('format') != SheetCache.FORMAT \
+                or stored.get('code') != SheetCache.code_version():
+            return OrderedDict()
+        return stored['sheets']
+
+    def save(self):
+        """
+        Writes the cache file atomically, read-only locations are skipped.
+        """
+        stored = {'format': SheetCache.FORMAT, 'code': SheetCache.code_version(),
+                  'sheets': self.sheets}
+        tmp_path = '{}.{}.tmp'.format(self.path, os.getpid())
+        try:
+            with open(tmp_path, 'wb') as f_handle:
+                pickle.dump(stored, f_handle, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -1,29 +1,228 @@
+import os
 import sys
+import json
+import threading
 import pandas as pd
 
-from ete3 import NCBITaxa
-
 from pymicruler.utils import util
+from pymicruler.utils.cache import LruCache
+
+
+class TaxonomyService:
+    instance = None
+    lock = threading.Lock()
+
+    def __init__(self, maxsize=10000):
+        """
+        Keeps the NCBI taxonomy database open and memoizes name to TaxID and
+        TaxID to lineage translations. Translations contained in a loaded
+        lineage snapshot are answered without accessing the database.
+
+        :param maxsize: Maximal number of cached entries per translation type.
+        :type: Integer
+        """
+        self.taxids = LruCache(maxsize)
+        self.lineages = LruCache(maxsize)
+        self.snapshot_taxids = dict()
+        self.snapshot_lineages = dict()
+        self.snapshots = dict()
+        self.snapshot_hits = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get():
+        """
+        Returns the process-wide taxonomy service, concurrent first callers
+        share the same instance.
+
+        :return: Shared taxonomy service
+        :rtype: TaxonomyService
+        """
+        if TaxonomyService.instance is None:
+            with TaxonomyService.lock:
+                if TaxonomyService.instance is None:
+                    TaxonomyService.instance = TaxonomyService()
+        return TaxonomyService.instance
+
+    def _connect(self):
+        """
+        Opens the taxonomy database once per thread, as sqlite connections
+        cannot be shared between threads.
+
+        :return: Connection to the NCBI taxonomy
+        :rtype: NCBITaxa
+        """
+        ncbi = getattr(self._local, 'ncbi', None)
+        if ncbi is None:
+            from ete3 import NCBITaxa
+            ncbi = NCBITaxa()
+            self._local.ncbi = ncbi
+        return ncbi
+
+    def disconnect(self):
+        """
+        Drops the database connection of the current thread, e.g. after the
+        process was forked. The counter lock is replaced as well, as it may
+        have been held by another thread of the parent process.
+        """
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def translate(self, names):
+        """
+        Returns TaxIDs for all names that can be found in the taxonomy. Names
+        that are not cached are looked up in a single query.
+
+        :param names: Organism names
+        :type: Iterable
+        :return: TaxIDs for organism
+        :rtype: Dictionary
+        """
+        name2taxid = dict()
+        missing = []
+        snapshot_hits = 0
+        for name in names:
+            taxids = self.snapshot_taxids.get(name)
+            if taxids is not None:
+                snapshot_hits += 1
+            else:
+                taxids = self.taxids.get(name)
+            if taxids is None:
+                missing.append(name)
+            elif len(taxids) > 0:
+                name2taxid[name] = list(taxids)
+        self._count_snapshot_hits(snapshot_hits)
+
+        if len(missing) > 0:
+            found = self._connect().get_name_translator(missing)
+            for name in missing:
+                taxids = tuple(found.get(name, ()))
+                self.taxids.put(name, taxids)
+                if len(taxids) > 0:
+                    name2taxid[name] = list(taxids)
+        return name2taxid
+
+    def get_lineage_names(self, taxid):
+        """
+        Returns the names of all taxonomic levels of an organism below the
+        domain level.
+
+        :param taxid: TaxID of the organism
+        :type: Integer
+        :return: Lineage names from the most general to the most specific level
+        :rtype: List
+        """
+        taxid = int(taxid)
+        names = self.snapshot_lineages.get(taxid)
+        if names is not None:
+            self._count_snapshot_hits(1)
+        else:
+            names = self.lineages.get(taxid)
+        if names is None:
+            ncbi = self._connect()
+            lineage = ncbi.get_lineage(taxid)
+            translation = ncbi.get_taxid_translator(lineage)
+            names = tuple(translation[element] for element in lineage[3:])
+            self.lineages.put(taxid, names)
+        return list(names)
+
+    def _count_snapshot_hits(self, hits):
+        """
+        Adds lookups that were answered by a lineage snapshot.
+
+        :param hits: Number of lookups
+        :type: Integer
+        """
+        if hits > 0:
+            with self._lock:
+                self.snapshot_hits += hits
+
+    def load_snapshot(self, path):
+        """
+        Loads a lineage snapshot unless the same version of the file was
+        already loaded.
+
+        :param path: Path to the lineage snapshot
+        :type: String
+        """
+        path = os.path.abspath(path)
+        mtime = os.stat(path).st_mtime_ns
+        with self._lock:
+            if self.snapshots.get(path) == mtime:
+                return
+
+            with open(path, 'r', encoding='UTF-8') as f_handle:
+                snapshot = json.load(f_handle)
+
+            for name, taxids in snapshot['names'].items():
+                self.snapshot_taxids[name] = tuple(taxids)
+            for taxid, names in snapshot['lineages'].items():
+                self.snapshot_lineages[int(taxid)] = tuple(names)
+            self.snapshots[path] = mtime
+
+    def export_snapshot(self, names, path):
+        """
+        Writes TaxIDs and lineage names of the given organisms to a snapshot
+        file. Names that cannot be found in the taxonomy are stored as well,
+        so they are not looked up again.
+
+        :param names: Organism names
+        :type: Iterable
+        :param path: Path of the snapshot file
+        :type: String
+        """
+        names = sorted(set(names))
+        name2taxid = self.translate(names)
+
+        lineages = dict()
+        for taxids in name2taxid.values():
+            for taxid in taxids:
+                lineages[str(taxid)] = self.get_lineage_names(taxid)
+
+        snapshot = {'names': {name: name2taxid.get(name, []) for name in names},
+                    'lineages': lineages}
+        with open(path, 'w', encoding='UTF-8') as f_handle:
+            json.dump(snapshot, f_handle, indent=1, sort_keys=True)
+
+    def info(self):
+        """
+        Summarises hits and misses of both translation caches and the number
+        of lookups answered by lineage snapshots.
+
+        :return: Cache statistics for TaxID and lineage lookups
+        :rtype: Dictionary
+        """
+        with self._lock:
+            snapshot_hits = self.snapshot_hits
+        return {'taxids': self.taxids.info(), 'lineages': self.lineages.info(),
+                'snapshot_hits': snapshot_hits}
 
 
 class TaxonomyHandler:
+    all_cmps = None
+
     @staticmethod
-    def run_quality_check(table):
+    def run_quality_check(table, verbose=True):
         """
         Analyses if all organisms and compounds are known.
 
         :param table: Parsed Eucast breakpoint table.
+        :param verbose: Whether unknown entries are printed.
+        :type: Boolean
+        :return: Unknown organisms and compounds
+        :rtype: Numpy ndarray/None, List
         """
         if sum(pd.isna(table.organism.unique())) + sum(pd.isna(table.cmp_name.unique())) > 0:
             print(util.OutText.NAN.value)
             sys.exit(0)
 
-        missing_organism = TaxonomyHandler._check_organism(table.organism.unique())
-        missing_compounds = TaxonomyHandler._check_compounds(table.cmp_name.unique())
+        missing_organism = TaxonomyHandler._check_organism(table.organism.unique(), verbose)
+        missing_compounds = TaxonomyHandler._check_compounds(table.cmp_name.unique(), verbose)
 
         if 'exception' in list(table):
             TaxonomyHandler._check_organism(table[pd.notna(
-                table.exception)].exception.unique())
+                table.exception)].exception.unique(), verbose)
         return missing_organism, missing_compounds
 
     @staticmethod
@@ -36,27 +235,18 @@ class TaxonomyHandler:
         :return: lineages (names) for all organisms.
         rtype: List
         """
-        all_names = []
-
-        ncbi = NCBITaxa()
-
-        lineages = [ncbi.get_lineage(x) for x in all_orgs]
-        names = [ncbi.get_taxid_translator(x) for x in lineages]
-
-        for lineage, name in zip(lineages, names):
-            curr_names = []
-            for element in lineage[3:]:
-                curr_names.append(name[element])
-            all_names.append(curr_names)
-        return all_names
+        service = TaxonomyService.get()
+        return [service.get_lineage_names(x) for x in all_orgs]
 
     @staticmethod
-    def _check_organism(all_orgs):
+    def _check_organism(all_orgs, verbose=True):
         """
         Check if all organisms could be mapped against the NCBI taxonomy.
 
         :param column: Array of all organisms
         :type: Numpy ndarray
+        :param verbose: Whether unknown organisms are printed.
+        :type: Boolean
         """
         if sum(pd.isna(all_orgs)) > 0:
             print(util.OutText.NA_ORG.value)
@@ -65,7 +255,7 @@ class TaxonomyHandler:
         name2taxid = TaxonomyHandler.translate_all(all_orgs)
 
         if len(name2taxid) != len(all_orgs):
-            missing = TaxonomyHandler._find_missing_entries(name2taxid, all_orgs)
+            missing = TaxonomyHandler._find_missing_entries(name2taxid, all_orgs, verbose)
             return missing
 
     @staticmethod
@@ -78,44 +268,101 @@ class TaxonomyHandler:
         :return: TaxIDs for organism
         :rtype: Dictionary
         """
-        ncbi = NCBITaxa()
-        name2taxid = ncbi.get_name_translator(orgs)
-        return name2taxid
+        return TaxonomyService.get().translate(orgs)
 
     @staticmethod
-    def _check_compounds(column):
+    def export_lineage_snapshot(resource, resource_path):
+        """
+        Exports TaxIDs and lineages for all organisms referenced by a compiled
+        resource, the intrinsic resistance table and the phenotypically defined
+        groups into a snapshot which is stored next to the resource.
+
+        :param resource: Compiled guidelines table
+        :type: Pandas DataFrame
+        :param resource_path: Path the guidelines table is stored at
+        :type: String
+        :return: Path to the lineage snapshot
+        :rtype: String
+        """
+        organisms = set(resource.organism.dropna())
+        if 'exception' in list(resource):
+            organisms.update(resource.exception.dropna())
+        organisms.update(pd.read_csv(util.Path.IRES.value).organism.dropna())
+        for members in util.read_in_reference_dict('phen_groups').values():
+            organisms.update(members.dropna())
+
+        snapshot_path = resource_path + util.CacheFiles.LINEAGES.value
+        TaxonomyService.get().export_snapshot(organisms, snapshot_path)
+        return snapshot_path
+
+    @staticmethod
+    def load_lineage_snapshot(resource_path):
+        """
+        Loads the lineage snapshot stored next to a resource, if there is one.
+
+        :param resource_path: Path to the compiled guidelines table
+        :type: String
+        """
+        snapshot_path = resource_path + util.CacheFiles.LINEAGES.value
+        if os.path.exists(snapshot_path):
+            TaxonomyService.get().load_snapshot(snapshot_path)
+
+    @staticmethod
+    def reset_connection():
+        """
+        Closes the connection of the shared taxonomy service for the current
+        thread, it is reopened on the next database lookup.
+        """
+        TaxonomyService.get().disconnect()
+
+    @staticmethod
+    def cache_info():
+        """
+        Returns hit and miss counters of the shared taxonomy service.
+
+        :return: Cache statistics for TaxID and lineage lookups
+        :rtype: Dictionary
+        """
+        return TaxonomyService.get().info()
+
+    @staticmethod
+    def _check_compounds(column, verbose=True):
         """
         Analyses if all compounds in the guidelines are known.
 
         :param column: Array of all compounds
         :type: Numpy ndarray
+        :param verbose: Whether unknown compounds are printed.
+        :type: Boolean
+        :return: Unknown compounds
+        :rtype: List
         """
-        all_cmps = TaxonomyHandler.get_all_cmps()
+        all_cmps = set(TaxonomyHandler.get_all_cmps())
+        missing_cmps = [x for x in column if x not in all_cmps]
 
-        if column.any() not in all_cmps:
-            missing_cmps = [x if x not in all_cmps else None for x in column]
+        if len(missing_cmps) > 0 and verbose:
             print(util.OutText.M_CMP.value.format(missing_cmps))
-        else:
-            missing_cmps = []
 
         return missing_cmps
 
     @staticmethod
     def get_all_cmps():
         """
-        Reads in all known compounds.
+        Reads in all known compounds once per process.
 
         :return: List of all known compounds
         :rtype: List
         """
-        cmp_classes = util.read_in_reference_dict('cmp_classes')
-        all_cmps = []
-        for cmp_class, cmps in cmp_classes.items():
-            all_cmps.extend(cmps)
-        return all_cmps
+        if TaxonomyHandler.all_cmps is None:
+            cmp_classes = util.read_in_reference_dict('cmp_classes')
+            all_cmps = []
+            for cmp_class, cmps in cmp_classes.items():
+                all_cmps.extend(cmps)
+            TaxonomyHandler.all_cmps = all_cmps
+        return TaxonomyHandler.all_cmps
 
     @staticmethod
-    def _find_missing_entries(taxids, organisms):
+    def _find_missing_entries(taxids, organisms, verbose=True):
         """
         Returns entries that could not be mapped to the NCBI Taxonomy.
 
@@ -123,7 +370,10 @@ class TaxonomyHandler:
         :type: Dictionary
         :param organisms: All organisms that should be converted
         :type: Numpy ndarray
+        :param verbose: Whether unknown organisms are printed.
+        :type: Boolean
         """
         missing = [x not in taxids.keys() for x in organisms]
-        print(util.OutText.M_TAX.value.format(organisms[missing]))
+        if verbose:
+            print(util.OutText.M_TAX.value.format(organisms[missing]))
         return organisms[missing]
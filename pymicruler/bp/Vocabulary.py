@@ -0,0 +1,50 @@
+from pandas.api.types import CategoricalDtype
+
+from pymicruler.utils import util
+
+
+class Vocabulary:
+    def __init__(self, resource, compounds):
+        """
+        Shared categories for compound names, built from the compound
+        dictionary and the compiled guidelines. Organisms are encoded with
+        the categories of the respective table.
+
+        :param resource: Parsed Eucast guidelines table.
+        :type: Pandas DataFrame
+        :param compounds: Compounds of the compound dictionary
+        :type: List
+        """
+        names = set(compounds)
+        names.update(resource.cmp_name.dropna())
+        self.compounds = CategoricalDtype(sorted(names))
+
+    def encode(self, table):
+        """
+        Converts organism and compound names of a table to categories. All
+        compounds of the table have to be part of the vocabulary.
+
+        :param table: Table with organism and cmp_name columns
+        :type: Pandas DataFrame
+        :return: Table with categorical organism and cmp_name columns
+        :rtype: Pandas DataFrame
+        """
+        table['organism'] = table.organism.astype(object).astype('category')
+        table['cmp_name'] = table.cmp_name.astype(object).astype(self.compounds)
+        return table
+
+    @staticmethod
+    def decode(table):
+        """
+        Converts all categorical name columns of a table back to strings.
+
+        :param table: Table with categorical columns
+        :type: Pandas DataFrame
+        :return: Table without categorical name columns
+        :rtype: Pandas DataFrame
+        """
+        columns = [x for x in util.Cols.CATEGORIES.value
+                   if x in list(table) and isinstance(table[x].dtype, CategoricalDtype)]
+        if len(columns) > 0:
+            table = table.astype({x: object for x in columns})
+        return table
@@ -0,0 +1,79 @@
+from collections import OrderedDict
+from threading import Lock
+
+
+class LruCache:
+    def __init__(self, maxsize=128):
+        """
+        Bounded mapping which evicts the least recently used entry and counts
+        hits and misses.
+
+        :param maxsize: Maximal number of stored entries.
+        :type: Integer
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        """
+        Returns the entry stored for a key and marks it as recently used.
+
+        :param key: Key of the entry
+        :param default: Value returned if the key is not cached.
+        :return: Cached entry or default
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """
+        Stores an entry and evicts the least recently used ones if the cache
+        is full.
+
+        :param key: Key of the entry
+        :param value: Entry to be stored
+        """
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Removes all entries and resets the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """
+        Summarises the usage of the cache.
+
+        :return: Hits, misses, hit ratio, current and maximal size
+        :rtype: Dictionary
+        """
+        with self._lock:
+            hits, misses, size = self.hits, self.misses, len(self._entries)
+        lookups = hits + misses
+        return {'hits': hits,
+                'misses': misses,
+                'hit_ratio': hits / lookups if lookups > 0 else 0.0,
+                'size': size,
+                'maxsize': self.maxsize}
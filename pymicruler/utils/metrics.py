@@ -0,0 +1,98 @@
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import Lock
+
+import pandas as pd
+
+
+class StageMetrics:
+    def __init__(self):
+        """
+        Aggregates wall time, processed rows and cache hits per pipeline
+        stage. Memory use does not grow with the number of runs, callbacks
+        receive every single measurement. Stages can be measured from
+        several threads at once.
+        """
+        self.stages = OrderedDict()
+        self.callbacks = []
+        self._lock = Lock()
+
+    def add_callback(self, callback):
+        """
+        Registers a function that is called after every stage with the stage
+        name and its measurement (seconds, rows, hits, misses).
+
+        :param callback: Function accepting a stage name and a dictionary
+        :type: Callable
+        """
+        self.callbacks.append(callback)
+
+    @contextmanager
+    def stage(self, name, rows=None, cache=None):
+        """
+        Measures the enclosed block as one run of a stage.
+
+        :param name: Name of the stage
+        :type: String
+        :param rows: Number of rows processed in the stage
+        :type: Integer
+        :param cache: Function returning the current hit and miss counters
+        of the cache used in the stage
+        :type: Callable
+        """
+        before = cache() if cache is not None else None
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = {'seconds': time.perf_counter() - start,
+                      'rows': rows if rows is not None else 0,
+                      'hits': 0, 'misses': 0}
+            if before is not None:
+                after = cache()
+                record['hits'] = after['hits'] - before['hits']
+                record['misses'] = after['misses'] - before['misses']
+            self._add(name, record)
+
+    def _add(self, name, record):
+        """
+        Adds a measurement to the totals of its stage and passes it on to all
+        callbacks.
+
+        :param name: Name of the stage
+        :type: String
+        :param record: Seconds, rows, hits and misses of the measurement
+        :type: Dictionary
+        """
+        with self._lock:
+            totals = self.stages.get(name)
+            if totals is None:
+                totals = {'calls': 0, 'seconds': 0.0, 'rows': 0, 'hits': 0, 'misses': 0}
+                self.stages[name] = totals
+            totals['calls'] += 1
+            for key, value in record.items():
+                totals[key] += value
+
+        for callback in self.callbacks:
+            callback(name, record)
+
+    def reset(self):
+        """
+        Removes all measurements, callbacks are kept.
+        """
+        with self._lock:
+            self.stages = OrderedDict()
+
+    def summary(self):
+        """
+        Returns the totals of all stages in the order they were first run.
+
+        :return: Calls, seconds, rows, hits and misses per stage
+        :rtype: Pandas DataFrame
+        """
+        with self._lock:
+            stages = OrderedDict((x, dict(y)) for x, y in self.stages.items())
+        return pd.DataFrame.from_dict(
+            stages, orient='index',
+            columns=['calls', 'seconds', 'rows', 'hits', 'misses'])
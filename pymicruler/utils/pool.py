@@ -0,0 +1,65 @@
+import atexit
+import multiprocessing
+from threading import Lock
+
+# Process pools kept alive between calls, keyed on their worker initializer
+pools = dict()
+_lock = Lock()
+
+
+def get_pool(processes, initializer=None):
+    """
+    Returns the process pool of the given size for a worker initializer. The
+    pool is kept alive between calls, so every worker is only initialised
+    once. A pool of another size for the same initializer is replaced.
+
+    :param processes: Number of worker processes.
+    :type: Integer
+    :param initializer: Function run once in every worker process
+    :type: Callable
+    :return: Process pool
+    :rtype: multiprocessing.Pool
+    """
+    with _lock:
+        entry = pools.get(initializer)
+        if entry is None or entry[0] != processes:
+            _terminate(initializer)
+            entry = (processes, multiprocessing.Pool(processes, initializer=initializer))
+            pools[initializer] = entry
+        return entry[1]
+
+
+def close_pool(initializer=None):
+    """
+    Shuts down the worker processes of the pool for a worker initializer.
+
+    :param initializer: Function run once in every worker process
+    :type: Callable
+    """
+    with _lock:
+        _terminate(initializer)
+
+
+def close_all():
+    """
+    Shuts down the worker processes of all pools.
+    """
+    with _lock:
+        for initializer in list(pools):
+            _terminate(initializer)
+
+
+def _terminate(initializer):
+    """
+    Terminates and removes a pool, the lock has to be held by the caller.
+
+    :param initializer: Function run once in every worker process
+    :type: Callable
+    """
+    entry = pools.pop(initializer, None)
+    if entry is not None:
+        entry[1].terminate()
+        entry[1].join()
+
+
+atexit.register(close_all)
@@ -1,4 +1,7 @@
 from enum import Enum
+from functools import lru_cache
+import importlib.util
+import re
 import pandas as pd
 
 from pymicruler.bp import config_resource, config_output
@@ -20,9 +23,12 @@ class Cols(Enum):
     RED = ['organism', 'cmp_name', 'cmp_family', 's_value', 'r_value',
            'exception', 'high_exposure', 'roa', 'indication']
     BP_OUT = ['cmp_name', 's_value', 'r_value', 'notes']
-    RULER_DROP_ELSE = ['lineage', 'organism_id']
+    RULER_DROP_ELSE = ['organism_id']
     ADDED_SMPL = ['s_value', 'r_value', 'matched_organism', 'matched_cmp_name', 'label']
     ADDED_BP = ['s_value', 'r_value', 'matched_organism', 'matched_cmp_name']
+    UNKNOWN = ['type', 'name', 'rows']
+    CATEGORIES = ['organism', 'cmp_name', 'matched_organism', 'matched_cmp_name',
+                  'exception', 'label']
 
 
 # Paths to external resources for analysis
@@ -31,12 +37,27 @@ class Path(Enum):
     MISSING_NOTES = config_output('missing_notes')
     OLD_OCC = config_resource('interpretive_text')
     IRU_CHANGES = config_output('interpretive_rule_changes')
+    SHEET_CACHE = config_output('sheet_cache')
     RENAME = config_resource('species_renaming')
     IRES = config_resource('ires')
     C_CLASS = config_resource('compound_classes')
     PHEN_G = config_resource('phen_groups')
 
 
+# Suffixes of files that are stored next to a parsed guidelines table
+class CacheFiles(Enum):
+    # Binary copy of the guidelines and their breakpoint index
+    RESOURCE = '.pymicruler.pkl'
+    # Organism names, TaxIDs and lineages of all organisms in the guidelines
+    LINEAGES = '.lineages.json'
+
+
+# Suffixes of columnar table formats, read and written with pyarrow
+class Columnar(Enum):
+    PARQUET = '.parquet'
+    FEATHER = '.feather'
+
+
 # Contains column indices for main columns in the Eucast Breakpoint Tables
 class ColPosStd(Enum):
     CMP_NAME = 0
@@ -89,6 +110,9 @@ class CmpRegex(Enum):
     CMP = '^(\w|-)*( acid)?'
     # Matches superscript that contains 'HE'
     HE = '§?HE,?'
+    # Tokens removed from the compound entry before the compound name is matched,
+    #  tokens starting at the same position are matched in this order
+    TOKENS = ['PAR', 'ROA', 'HE', 'SS']
 
 
 # Regular experession patterns which match irrelevant comments with minor
@@ -115,6 +139,26 @@ class NoteRegex(Enum):
                     "administration\.$]"]
 
 
+# Settings for matching new notes against the notes of the interpretation dictionary
+class NoteMatch(Enum):
+    # Matches the words notes are compared by
+    WORD = r'\w+'
+    # Matches numbers, notes are only classified alike if their numbers are equal
+    NUMBER = r'\d+(?:[.,]\d+)?'
+    # Matches negations, notes are only classified alike if their negations are equal
+    NEGATION = r"\b(?:not|no|non|never|neither|nor|without|except|cannot)\b|n't\b"
+    # Matches genus names, abbreviated genera and organism groups, notes are only
+    # classified alike if they name the same organisms
+    ORGANISM = r'\b[A-Z][a-z]?\.(?= ?[a-z])|\b[A-Z][a-z]{2,}\b|\b[a-z]+(?:cocci|bacteria|bacilli)\b'
+    # Number of consecutive words forming one shingle
+    SHINGLE = 2
+    # Minimal similarity for taking over the classification of a known note once
+    # automatic classification is switched on
+    AUTO = 0.95
+    # Minimal similarity for proposing a known note during manual classification
+    PROPOSE = 0.6
+
+
 class Info(Enum):
     # All information in parentheses found to be irrelevant for the analysis
     IRR_PAR = ['screen', 'test for high-level streptomycin resistance',
@@ -185,6 +229,10 @@ class OutText(Enum):
                 '(a) classify them via the console directly or \n(b) save comments into the ' \
                 '"missing_notes.xlsx" file to be categorized manually.'
     CONS = 'The notes will be categorized in the console'
+    MATCHED = '{} new comments were classified like the most similar known comment:'
+    MATCHED_NOTE = '"{}"\n  classified like "{}" (similarity {:.2f})'
+    PROPOSAL = 'The most similar known comment (similarity {:.2f}) is:\n"{}"\n' \
+               'It was classified as: {}'
     MAN_CLASS = 'The notes were saved in the "missing_notes.xlsx" file and the program ' \
                 'will be stopped. Please consult the Readme for more information ' \
                 'about the classification.'
@@ -241,6 +289,22 @@ class OutText(Enum):
                   ' since the last version. Please consult the online documentation (https://pymicruler.readthedocs.io/en/latest/) on how to implement ' \
                   'them manually.'
     NAN = 'Error: Some of the organisms or compounds in the query table are NaN.'
+    ARROW = 'Error: Reading and writing "{}" files requires pyarrow, install it ' \
+            'with "pip install pymicruler[arrow]".'
+
+
+@lru_cache(maxsize=None)
+def compiled(pattern):
+    """
+    Returns the compiled regular expression of a pattern. Every pattern is
+    only compiled once per process.
+
+    :param pattern: Pattern of one of the regular expression enums
+    :type: String
+    :return: Compiled regular expression
+    :rtype: Pattern
+    """
+    return re.compile(pattern)
 
 
 def read_in_reference_dict(name):
@@ -261,3 +325,71 @@ def read_in_reference_dict(name):
         if len(sheet) > 0:
             reference_dict[list(sheet)[0]] = sheet.loc[:, list(sheet)[0]]
     return reference_dict
+
+
+def read_table(path):
+    """
+    Reads a table from a Parquet, Feather, CSV or Excel file depending on the
+    suffix of the path. Categorical columns of columnar files are restored.
+
+    :param path: Path to the table
+    :type: String
+    :return: Table
+    :rtype: Pandas DataFrame
+    """
+    if path.endswith(Columnar.PARQUET.value):
+        require_arrow(path)
+        return pd.read_parquet(path, engine='pyarrow')
+    elif path.endswith(Columnar.FEATHER.value):
+        require_arrow(path)
+        return pd.read_feather(path)
+    elif path.endswith('.csv'):
+        return pd.read_csv(path)
+    return pd.read_excel(path)
+
+
+def write_table(table, path):
+    """
+    Writes a table to a Parquet, Feather, CSV or Excel file depending on the
+    suffix of the path. In columnar files organism, compound and label columns
+    are stored as categories.
+
+    :param table: Table to be written
+    :type: Pandas DataFrame
+    :param path: Path of the output file
+    :type: String
+    """
+    if path.endswith(Columnar.PARQUET.value):
+        require_arrow(path)
+        to_categories(table).to_parquet(path, engine='pyarrow', index=False)
+    elif path.endswith(Columnar.FEATHER.value):
+        require_arrow(path)
+        to_categories(table).reset_index(drop=True).to_feather(path)
+    elif path.endswith('.csv'):
+        table.to_csv(path, index=False)
+    else:
+        table.to_excel(path, index=False)
+
+
+def to_categories(table):
+    """
+    Converts organism, compound and label columns of a table to categories.
+
+    :param table: Table to be converted
+    :type: Pandas DataFrame
+    :return: Table with categorical columns
+    :rtype: Pandas DataFrame
+    """
+    columns = [x for x in Cols.CATEGORIES.value if x in list(table)]
+    return table.astype({x: 'category' for x in columns})
+
+
+def require_arrow(path):
+    """
+    Ensures pyarrow is installed before a columnar file is accessed.
+
+    :param path: Path to the columnar file
+    :type: String
+    """
+    if importlib.util.find_spec('pyarrow') is None:
+        raise ImportError(OutText.ARROW.value.format(path))
@@ -12,6 +12,7 @@ setup(
     description='',
     requires=['pandas', 'openpyxl', 'pyknow', 'xlrd', 'ete3', 'numpy'],
     install_requires=['pandas', 'openpyxl', 'pyknow', 'xlrd', 'ete3', 'numpy'],
+    extras_require={'arrow': ['pyarrow']},
     entry_points={
         'console_scripts': [
             'pymicruler=pymicruler.command_line:run'
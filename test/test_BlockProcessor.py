@@ -0,0 +1,23 @@
+import unittest
+import numpy as np
+
+from pymicruler.bp.BlockProcessor import BlockProcessor
+
+
+class TestBlockProcessor(unittest.TestCase):
+
+    def test_process_compound(self):
+        expected = {
+            'Amoxicillin oral§2, HE': ('Amoxicillin', np.NaN, 'oral', '2', np.NaN, 1),
+            'Nalidixic acid (screen)§4': ('Nalidixic acid', 'screen', np.NaN, '4', np.NaN, np.NaN),
+            'Cefuroxime ivHE, E. coli, Klebsiella spp. (except K. aerogenes)':
+                ('Cefuroxime', np.NaN, 'iv', np.NaN,
+                 'E. coli, Klebsiella spp. (except K. aerogenes)', 1),
+            'X (a) (1)': ('X', 'a', np.NaN, '1', '()', np.NaN),
+        }
+        for entry, result in expected.items():
+            np.testing.assert_equal(result, BlockProcessor._process_compound(entry))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,10 @@
 import unittest
 import pandas as pd
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 from pymicruler.bp.BpRuler import BpRuler
+from pymicruler.bp import RuleBasedEngine
 
 
 class TestBpRuler(unittest.TestCase):
@@ -32,6 +34,81 @@ class TestBpRuler(unittest.TestCase):
         reference = pd.read_pickle('resources/full_query.pkl')
         pd.testing.assert_frame_equal(reference, full_table)
 
+    def test_session_queries(self):
+        session = BpRuler.from_resource(self.path_to_resource)
+        reference = pd.read_pickle('resources/breakpoint_query.pkl')
+        for _ in range(2):
+            bp_table = session.query(self.input)
+            pd.testing.assert_frame_equal(reference, bp_table)
+
+    def test_concurrent_session_calls(self):
+        session = BpRuler.from_resource(self.path_to_resource)
+        reference = pd.read_pickle('resources/label_query.pkl')
+        RuleBasedEngine.outcome_cache.clear()
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda x: session.classify(self.input), range(8)))
+        for label_table in results:
+            pd.testing.assert_frame_equal(reference, label_table)
+
+    def test_unknown_report(self):
+        session = BpRuler.from_resource(self.path_to_resource)
+        session.query(self.input)
+        report = session.unknown_report
+        self.assertEqual(['compound'], list(report.type))
+        self.assertEqual(['Mupirocin'], list(report.name))
+        self.assertEqual([3], list(report.rows))
+
+    def test_classify_chunks(self):
+        session = BpRuler.from_resource(self.path_to_resource)
+        table = self.input.sort_values('sample_id', kind='mergesort')
+        chunks = [table[i:i + 50] for i in range(0, len(table), 50)]
+        label_table = pd.concat(session.classify_chunks(chunks), sort=False)
+        reference = pd.read_pickle('resources/label_query.pkl')
+        key = ['sample_id', 'cmp_name']
+        pd.testing.assert_frame_equal(
+            reference.sort_values(key).reset_index(drop=True),
+            label_table.sort_values(key).reset_index(drop=True))
+        self.assertEqual([3], list(session.unknown_report.rows))
+
+    def test_query_stats(self):
+        session = BpRuler.from_resource(self.path_to_resource)
+        session.query(pd.concat((self.input, self.input)))
+        self.assertEqual(444, session.query_stats['queried_rows'])
+        self.assertEqual(162, session.query_stats['pairs'])
+        self.assertEqual(7, session.query_stats['taxids'])
+
+    def test_stage_metrics(self):
+        session = BpRuler.from_resource(self.path_to_resource)
+        measured = []
+        session.metrics.add_callback(lambda name, record: measured.append(name))
+        session.phenotype(self.input)
+        summary = session.metrics.summary()
+        self.assertEqual(['quality_check', 'taxids', 'lineages', 'breakpoints',
+                          'classification', 'rule_engine', 'rule_results',
+                          'prepare_output'], list(summary.index))
+        self.assertEqual(list(summary.index), measured)
+        self.assertEqual(222, summary.loc['breakpoints', 'rows'])
+
+    def test_rule_stats(self):
+        session = BpRuler.from_resource(self.path_to_resource)
+        session.rule_stats = RuleBasedEngine.RuleStats()
+        RuleBasedEngine.outcome_cache.clear()
+        full_table = session.phenotype(self.input)
+        reference = pd.read_pickle('resources/full_query.pkl')
+        pd.testing.assert_frame_equal(reference, full_table)
+
+        stats = session.rule_stats.table()
+        self.assertEqual(['activations', 'declared', 'retracted', 'seconds'], list(stats))
+        self.assertGreater(stats.loc['exec_rule_8_1', 'declared'], 0)
+        self.assertIsNone(session.thread_engine().rule_stats)
+
+        summary = session.rule_stats.summary()
+        session.phenotype(self.input)
+        self.assertEqual(2 * summary['samples'], session.rule_stats.samples)
+        self.assertEqual(summary['engine_runs'], session.rule_stats.engine_runs)
+        self.assertEqual(summary['memo_hits'] + summary['samples'],
+                         session.rule_stats.summary()['memo_hits'])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+import os
+import pandas as pd
+
+from pymicruler.bp.BreakpointIndex import BreakpointIndex
+
+
+class TestBreakpointIndex(unittest.TestCase):
+    def setUp(self):
+        working_directory = os.path.abspath(os.path.dirname(__file__))
+        path_to_resource = os.path.join(
+            working_directory, 'resources', 'processed_v_8.1_Breakpoint_Tables.xlsx')
+        self.resource = pd.read_excel(path_to_resource)
+        self.index = BreakpointIndex(self.resource)
+
+    def test_most_specific_level(self):
+        lineage = ['Proteobacteria', 'Gammaproteobacteria', 'Xanthomonadales',
+                   'Xanthomonadaceae', 'Stenotrophomonas',
+                   'Stenotrophomonas maltophilia group', 'Stenotrophomonas maltophilia']
+        result = self.index.look_up(lineage, 'Ampicillin')
+        self.assertEqual(result, [-1.0, 0.0, 'Stenotrophomonas maltophilia', 'Ampicillin'])
+
+    def test_exception_is_skipped(self):
+        row = self.resource[pd.notna(self.resource.exception)].iloc[0]
+        lineage = [row.organism, row.exception]
+        result = self.index.look_up(lineage, row.cmp_name)
+        self.assertNotEqual(result[2], row.organism)
+
+    def test_missing_breakpoint(self):
+        self.assertEqual(self.index.look_up(['Unknown'], 'Ampicillin'), [None]*4)
+
+    def test_resolve_matches_look_up(self):
+        row = self.resource[pd.notna(self.resource.exception)].iloc[0]
+        lineages = {1.0: ('Proteobacteria', 'Gammaproteobacteria', 'Xanthomonadales',
+                          'Xanthomonadaceae', 'Stenotrophomonas',
+                          'Stenotrophomonas maltophilia group',
+                          'Stenotrophomonas maltophilia'),
+                    2.0: (row.organism, row.exception)}
+        pairs = pd.DataFrame({'organism_id': [1.0, 1.0, 2.0, 3.0],
+                              'cmp_name': ['Ampicillin', 'Unknown', row.cmp_name, 'Ampicillin']})
+        resolved = self.index.resolve(pairs, lineages)
+        for _, x in resolved.iterrows():
+            expected = self.index.look_up(lineages.get(x.organism_id, ()), x.cmp_name)
+            result = [None if pd.isna(y) else y for y in
+                      x[['s_value', 'r_value', 'matched_organism', 'matched_cmp_name']]]
+            self.assertEqual(expected, result)
+
+    def test_resolve_categorical_pairs(self):
+        lineages = {1.0: ('Proteobacteria', 'Gammaproteobacteria', 'Xanthomonadales',
+                          'Xanthomonadaceae', 'Stenotrophomonas',
+                          'Stenotrophomonas maltophilia group',
+                          'Stenotrophomonas maltophilia')}
+        pairs = pd.DataFrame({'organism_id': [1.0, 1.0, 1.0],
+                              'cmp_name': ['Ampicillin', 'Unknown', 'Meropenem']})
+        categories = pd.api.types.CategoricalDtype(
+            sorted(set(self.resource.cmp_name.dropna()).union(['Unknown'])))
+        expected = self.index.resolve(pairs, lineages)
+        resolved = self.index.resolve(pairs.astype({'cmp_name': categories}), lineages)
+        pd.testing.assert_frame_equal(expected, resolved.astype({'cmp_name': object}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,5 @@
 import unittest
+import tempfile
 import os
 import pandas as pd
 
@@ -19,6 +20,33 @@ class TestEucastParser(unittest.TestCase):
         reference = pd.read_pickle(outpath)
         pd.testing.assert_frame_equal(reference, result)
 
+    def test_incremental_parse(self):
+        working_directory = os.path.abspath(os.path.dirname(__file__))
+        inpath = os.path.join(working_directory, 'resources', 'parser_input.xlsx')
+        reference = pd.read_pickle(
+            os.path.join(working_directory, 'resources', 'parser_output.pkl'))
+        cache_path = os.path.join(tempfile.mkdtemp(), 'sheet_cache.pkl')
+
+        first = EucastParser()
+        first.sheet_cache_path = cache_path
+        pd.testing.assert_frame_equal(reference, first.run_eucast_parser(inpath, incremental=True))
+
+        second = EucastParser()
+        second.sheet_cache_path = cache_path
+        pd.testing.assert_frame_equal(reference, second.run_eucast_parser(inpath, incremental=True))
+        self.assertEqual(0, second.sheet_cache.misses)
+        self.assertEqual(first.sheet_cache.misses, second.sheet_cache.hits)
+
+    def test_parallel_parse(self):
+        working_directory = os.path.abspath(os.path.dirname(__file__))
+        inpath = os.path.join(working_directory, 'resources', 'parser_input.xlsx')
+        reference = pd.read_pickle(
+            os.path.join(working_directory, 'resources', 'parser_output.pkl'))
+
+        ep = EucastParser()
+        result = ep.run_eucast_parser(inpath, processes=2)
+        pd.testing.assert_frame_equal(reference, result)
+
 
 if __name__ == '__main__':
     unittest.main()
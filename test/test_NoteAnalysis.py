@@ -0,0 +1,39 @@
+import unittest
+
+from pymicruler.bp.NoteAnalysis import NoteAnalysis
+from pymicruler.utils import util
+
+
+class TestNoteAnalysis(unittest.TestCase):
+    def setUp(self):
+        self.note_analysis = NoteAnalysis()
+        self.text = next(iter(self.note_analysis.note_index))
+
+    def test_known_note(self):
+        self.note_analysis.check_if_known(self.text)
+        self.note_analysis.check_if_known('  ' + self.text.replace(' ', '\n', 1))
+        self.assertEqual([], self.note_analysis.unknown_note_list)
+
+    def test_reworded_note(self):
+        reworded = self.text.rstrip('.') + ' .'
+        self.note_analysis.check_if_known(reworded)
+        self.assertEqual([], self.note_analysis.matched_notes)
+        self.assertIn(reworded, self.note_analysis.proposals)
+
+    def test_reworded_note_auto_apply(self):
+        note_analysis = NoteAnalysis(auto_apply=util.NoteMatch.AUTO.value)
+        reworded = self.text.rstrip('.') + ' .'
+        note_analysis.check_if_known(reworded)
+        self.assertEqual([], note_analysis.unknown_note_list)
+        info = note_analysis.get_note_information(reworded, 'Escherichia coli', 'Amikacin')
+        self.assertEqual(reworded, info['note_text'])
+
+    def test_note_information(self):
+        index = self.note_analysis.note_index
+        info = self.note_analysis.get_note_information(self.text, 'Escherichia coli', 'Amikacin')
+        self.assertEqual(self.text, info['note_text'])
+        self.assertIs(index, self.note_analysis.note_index)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+
+from pymicruler.bp.NoteMatcher import NoteMatcher
+
+
+class TestNoteMatcher(unittest.TestCase):
+    def setUp(self):
+        self.matcher = NoteMatcher(auto_apply=0.9, propose=0.5)
+        self.matcher.add({'note_text': 'Wild type Enterobacteriaceae are categorised as '
+                                       'susceptible to aminopenicillins.', 'relevance': 1})
+        self.matcher.add({'note_text': 'For susceptibility testing purposes, the concentration '
+                                       'of clavulanic acid is fixed at 2 mg/L.', 'relevance': 0})
+
+    def test_apply(self):
+        decision, similarity, record = self.matcher.match(
+            'For susceptibility testing purposes the concentration of '
+            'clavulanic acid is fixed at 2 mg/L')
+        self.assertEqual('apply', decision)
+        self.assertEqual(0, record['relevance'])
+
+    def test_numbers_differ(self):
+        decision, similarity, record = self.matcher.match(
+            'For susceptibility testing purposes, the concentration '
+            'of clavulanic acid is fixed at 4 mg/L.')
+        self.assertEqual('propose', decision)
+
+    def test_propose(self):
+        decision, similarity, record = self.matcher.match(
+            'Wild type Enterobacterales are categorised as susceptible to aminopenicillins.')
+        self.assertEqual('propose', decision)
+        self.assertEqual(1, record['relevance'])
+
+    def test_negation_differs(self):
+        decision, similarity, record = self.matcher.match(
+            'Wild type Enterobacteriaceae are not categorised as '
+            'susceptible to aminopenicillins.')
+        self.assertEqual('propose', decision)
+
+    def test_organism_differs(self):
+        self.matcher.add({'note_text': 'Isolates of Staphylococcus aureus with a MIC above the '
+                                       'breakpoint are rare and must be confirmed by the '
+                                       'reference laboratory.', 'relevance': 1})
+        decision, similarity, record = self.matcher.match(
+            'Isolates of Staphylococcus epidermidis with a MIC above the breakpoint '
+            'are rare and must be confirmed by the reference laboratory.')
+        self.assertEqual('propose', decision)
+
+    def test_propose_by_default(self):
+        matcher = NoteMatcher()
+        matcher.add({'note_text': 'Wild type Enterobacteriaceae are categorised as '
+                                  'susceptible to aminopenicillins.', 'relevance': 1})
+        decision, similarity, record = matcher.match(
+            'Wild type Enterobacteriaceae are categorised as susceptible to aminopenicillins')
+        self.assertEqual('propose', decision)
+        self.assertEqual(1.0, similarity)
+
+    def test_no_match(self):
+        self.assertIsNone(self.matcher.match('Doripenem breakpoints removed.'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+import unittest
+import pandas as pd
+
+from pymicruler.bp.SampleStream import SampleStream
+
+
+class TestSampleStream(unittest.TestCase):
+    def setUp(self):
+        self.table = pd.DataFrame({'sample_id': [1, 1, 1, 2, 2, 3],
+                                   'cmp_name': ['a', 'b', 'c', 'a', 'b', 'a']})
+
+    def test_samples_are_not_split(self):
+        chunks = [self.table[i:i + 2] for i in range(0, len(self.table), 2)]
+        samples = [list(x.sample_id) for x in SampleStream.read_samples(chunks)]
+        self.assertEqual([[1, 1, 1], [2, 2], [3]], samples)
+
+    def test_unsorted_samples(self):
+        table = pd.concat((self.table, self.table[:1]))
+        chunks = [table[i:i + 2] for i in range(0, len(table), 2)]
+        with self.assertRaises(ValueError):
+            list(SampleStream.read_samples(chunks))
+
+    def test_sample_continued_within_chunk(self):
+        table = self.table.iloc[[0, 3, 1, 4, 5]]
+        with self.assertRaises(ValueError):
+            list(SampleStream.read_samples([table]))
+
+
+if __name__ == '__main__':
+    unittest.main()
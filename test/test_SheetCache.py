@@ -0,0 +1,34 @@
+import unittest
+import tempfile
+import os
+import pandas as pd
+from unittest import mock
+
+from pymicruler.bp.SheetCache import SheetCache
+
+
+class TestSheetCache(unittest.TestCase):
+    def setUp(self):
+        self.sheet = pd.DataFrame({'Enterobacteriaceae': ['MIC breakpoint', 'Ampicillin']})
+        self.path = os.path.join(tempfile.mkdtemp(), 'sheet_cache.pkl')
+
+    def test_stored_sheet(self):
+        cache = SheetCache(self.path)
+        cache.put(SheetCache.fingerprint(self.sheet), self.sheet, ['note'])
+        cache.save()
+        entry = SheetCache(self.path).get(SheetCache.fingerprint(self.sheet))
+        pd.testing.assert_frame_equal(self.sheet, entry[0])
+        self.assertEqual(['note'], entry[1])
+
+    def test_changed_parsing_code(self):
+        cache = SheetCache(self.path)
+        key = SheetCache.fingerprint(self.sheet)
+        cache.put(key, self.sheet, [])
+        cache.save()
+        with mock.patch.object(SheetCache, '_code_version', 'changed'):
+            self.assertNotEqual(key, SheetCache.fingerprint(self.sheet))
+            self.assertEqual(0, len(SheetCache(self.path).sheets))
+
+
+if __name__ == '__main__':
+    unittest.main()
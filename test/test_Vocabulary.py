@@ -0,0 +1,29 @@
+import unittest
+import pandas as pd
+
+from pymicruler.bp.Vocabulary import Vocabulary
+
+
+class TestVocabulary(unittest.TestCase):
+    def setUp(self):
+        resource = pd.DataFrame({'organism': ['Staphylococcus', 'Enterobacterales'],
+                                 'cmp_name': ['Vancomycin', 'Cephalexin']})
+        self.vocabulary = Vocabulary(resource, ['Amikacin', 'Vancomycin'])
+        self.table = pd.DataFrame({'organism': ['Staphylococcus aureus', 'Escherichia coli'],
+                                   'cmp_name': ['Vancomycin', 'Cephalexin']})
+
+    def test_shared_compound_codes(self):
+        first = self.vocabulary.encode(self.table.copy())
+        second = self.vocabulary.encode(self.table[::-1].copy())
+        self.assertEqual(['Amikacin', 'Cephalexin', 'Vancomycin'],
+                         list(first.cmp_name.cat.categories))
+        self.assertEqual(list(first.cmp_name.cat.codes),
+                         list(second.cmp_name.cat.codes)[::-1])
+
+    def test_decode(self):
+        table = Vocabulary.decode(self.vocabulary.encode(self.table.copy()))
+        pd.testing.assert_frame_equal(self.table, table)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+import tempfile
+import os
+import pandas as pd
+
+from pymicruler.utils import util
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+@unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+class TestColumnarTables(unittest.TestCase):
+    def setUp(self):
+        self.table = pd.read_pickle('resources/label_query.pkl')
+        self.out_dir = tempfile.mkdtemp()
+
+    def test_parquet(self):
+        self._assert_round_trip(os.path.join(self.out_dir, 'labels.parquet'))
+
+    def test_feather(self):
+        self._assert_round_trip(os.path.join(self.out_dir, 'labels.feather'))
+
+    def _assert_round_trip(self, path):
+        util.write_table(self.table, path)
+        table = util.read_table(path)
+        self.assertEqual('category', table.organism.dtype.name)
+        self.assertEqual('category', table.cmp_name.dtype.name)
+        pd.testing.assert_frame_equal(
+            util.to_categories(self.table).reset_index(drop=True), table)
+
+
+if __name__ == '__main__':
+    unittest.main()